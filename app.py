@@ -1,9 +1,17 @@
 import os
+import time
 from dotenv import load_dotenv
 import streamlit as st
 import pandas as pd
-from scan_titles_weighted_contextual_v3_riskaware import scan_titles_weighted
-import requests
+import metrics
+from lexicon import load_lexicon
+from report_export import XLSX_MIME, csv_bytes, parquet_available, parquet_bytes, xlsx_bytes
+from result_cache import RESULT_CACHE_PATH, ResultCache
+from scan_core import DETAIL_COLUMNS, known_categories
+from title_store import (
+    MAX_SEARCH_ROWS, ChannelNotFoundError, TitleStore, iter_channel_scan, rescore_store, score_channel,
+)
+from youtube_client import YouTubeClient
 import logging
 
 logging.basicConfig(level=logging.DEBUG)
@@ -78,135 +86,332 @@ if not api_key:
         "The YouTube API key is not configured yet. Add YOUTUBE_API_KEY in Streamlit Secrets for the deployed app."
     )
 
-channel_id = st.text_input("Enter the YouTube Channel ID (e.g., UC_x5XG1OV2P6uZZ5FSM9Ttw)").strip()
-max_results = st.number_input("Maximum number of titles to fetch", min_value=1, max_value=500, value=100)
-scan_button = st.button("Scan Titles", disabled=not api_key)
 
-def get_uploads_playlist_id(api_key, channel_id):
-    url = f"https://www.googleapis.com/youtube/v3/channels?part=contentDetails&id={channel_id}&key={api_key}"
+@st.cache_resource
+def get_youtube_client(api_key):
+    """Share one pooled YouTube client per API key across reruns and sessions."""
+    return YouTubeClient(api_key)
+
+
+@st.cache_resource
+def get_title_store():
+    """Open the on-disk title store once per server process."""
+    return TitleStore()
+
+
+@st.cache_resource
+def get_result_cache():
+    """Share scored titles across channels, reruns and restarts."""
+    return ResultCache(path=RESULT_CACHE_PATH)
+
+
+@st.cache_resource
+def rescore_stored_results(lexicon_version, _lexicon):
+    """Carry stored results over to a new lexicon once per version."""
+    return rescore_store(get_title_store(), _lexicon, get_result_cache())
+
+
+# Half-open [low, high) Safety Score ranges offered as result filters
+SCORE_BANDS = {
+    "High risk (below 40)": (0, 40),
+    "Medium risk (40-69)": (40, 70),
+    "Low risk (70 and up)": (70, float("inf")),
+}
+RESULT_SORTS = {
+    "Safety Score, lowest first": ("Safety Score", True),
+    "Safety Score, highest first": ("Safety Score", False),
+    "Title": ("Title", True),
+}
+RESULT_PAGE_SIZES = (50, 100, 250, 500)
+# Rows kept in the live table while a scan is streaming
+LIVE_TABLE_ROWS = 200
+
+# Titles fetched for a (channel_id, max_results, details) key are read back
+# from the title store for this long before the API is asked again.
+TITLES_TTL_SECONDS = 15 * 60
+
+
+@st.cache_resource
+def get_fetch_times():
+    """Last API fetch per (channel_id, max_results, details), shared by every session."""
+    return {}
+
+
+def titles_are_fresh(channel_id, max_results, details):
+    fetched_at = get_fetch_times().get((channel_id, max_results, details))
+    return fetched_at is not None and time.time() - fetched_at < TITLES_TTL_SECONDS
+
+
+def scan_from_api(client, channel_id, lexicon, max_results, cache, details):
+    """Fetch and score a channel, showing rows as pages arrive.
+
+    Returns the result rows, or None when the channel is not found.
+    """
+    status = st.info("Fetching video titles...")
+    # Without a limit there is no total to measure progress against
+    progress = st.progress(0.0, text="Fetching video titles...") if max_results else st.empty()
+    live_table = st.empty()
+    rows = []
     try:
-        response = requests.get(url, timeout=10)
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        logger.error("Error fetching channel details: %s", e)
+        # Only uploads newer than the last sync are fetched; each page
+        # is scored and shown before the next one is requested. The live
+        # table only shows the latest rows, so each update costs the same.
+        batches = iter_channel_scan(client, get_title_store(), channel_id, lexicon, max_results, cache, details)
+        for batch in batches:
+            rows.extend(batch)
+            if max_results is None:
+                status.info(f"Scanned {len(rows)} titles...")
+            else:
+                progress.progress(
+                    min(len(rows) / max_results, 1.0),
+                    text=f"Scanned {len(rows)} of up to {max_results} titles...",
+                )
+            live_table.dataframe(pd.DataFrame(rows[-LIVE_TABLE_ROWS:]), use_container_width=True)
+    except ChannelNotFoundError:
         return None
+    finally:
+        status.empty()
+        progress.empty()
+        live_table.empty()
+    get_fetch_times()[(channel_id, max_results, details)] = time.time()
+    return rows
+
+
+def save_scan(key, rows):
+    """Keep sorted results in the session for reruns; download files are built on first click."""
+    # Sort results by Safety Score (ascending)
+    df_results = pd.DataFrame(rows).sort_values(by="Safety Score", kind="stable")
+    st.session_state["scan"] = {
+        "key": key,
+        "results": df_results,
+        # One row per (result, category) for the category filter
+        "categories": df_results["Category"].str.split(", ").explode(),
+        "files": {},
+    }
+
+
+def export_data(saved, fmt, build):
+    """Return a zero-argument callable that builds an export once and then reuses it."""
+    def data():
+        files = saved["files"]
+        if fmt not in files:
+            files[fmt] = build(saved["results"])
+        return files[fmt]
+    return data
+
+
+def filter_results(saved, bands, categories):
+    df_results = saved["results"]
+    mask = pd.Series(True, index=df_results.index)
+    if bands:
+        scores = df_results["Safety Score"]
+        in_band = pd.Series(False, index=df_results.index)
+        for band in bands:
+            low, high = SCORE_BANDS[band]
+            in_band |= (scores >= low) & (scores < high)
+        mask &= in_band
+    if categories:
+        exploded = saved["categories"]
+        mask &= df_results.index.isin(exploded.index[exploded.isin(categories)])
+    return df_results[mask]
+
+
+def render_scan(saved, cache):
+    channel_id, max_results, lexicon_version, _ = saved["key"]
+    df_results = saved["results"]
+
+    st.success("Scan complete!")
+    scope = "all uploads" if max_results is None else f"up to {max_results} titles"
+    st.caption(
+        f"{channel_id} · {scope} · lexicon version {lexicon_version} · "
+        f"result cache {cache.hits} hits, {cache.misses} misses"
+    )
+
+    # Filtering, sorting and paging happen here, so only one page of rows
+    # is styled and sent to the browser however large the scan is.
+    band_column, category_column = st.columns(2)
+    bands = band_column.multiselect("Score band", list(SCORE_BANDS), key="results_bands")
+    category_options = sorted(saved["categories"].dropna().unique().tolist())
+    categories = category_column.multiselect(
+        "Category", [c for c in category_options if c != "-"], key="results_categories"
+    )
+    sort_column, size_column, page_column = st.columns(3)
+    sort_by = sort_column.selectbox("Sort by", list(RESULT_SORTS), key="results_sort")
+    page_size = size_column.selectbox("Rows per page", RESULT_PAGE_SIZES, index=1, key="results_page_size")
+
+    filtered = filter_results(saved, bands, categories)
+    column, ascending = RESULT_SORTS[sort_by]
+    if (column, ascending) != ("Safety Score", True):
+        filtered = filtered.sort_values(by=column, ascending=ascending, kind="stable")
+    page_count = max(1, -(-len(filtered) // page_size))
+    page = min(int(page_column.number_input("Page", min_value=1, value=1, key="results_page")), page_count)
+    start = (page - 1) * page_size
+    page_rows = filtered.iloc[start:start + page_size]
+
+    # Apply color scaling to the Safety Score column of the visible page; the
+    # fixed 0-100 range keeps colors comparable between pages.
+    score_columns = ["Safety Score"] + [
+        column for column in DETAIL_COLUMNS if column.endswith("Safety Score") and column in page_rows.columns
+    ]
+    with metrics.timer("styling"):
+        styled_df = page_rows.style.background_gradient(
+            cmap="RdYlGn", subset=score_columns, vmin=0, vmax=100
+        )
+
+    st.caption(
+        f"Page {page} of {page_count} · rows {start + 1 if len(page_rows) else 0}-{start + len(page_rows)} "
+        f"of {len(filtered)} matching ({len(df_results)} scanned)"
+    )
+    st.markdown("<div class='results-table'>", unsafe_allow_html=True)
+    # The Styler is lazy, so the gradient is computed while rendering
+    with metrics.timer("render_results"):
+        st.dataframe(styled_df, use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Exports cover every scanned row and are only built when first requested
+    st.download_button(
+        label="Download Excel File",
+        data=export_data(saved, "xlsx", xlsx_bytes),
+        file_name="youtube_title_scan_results.xlsx",
+        mime=XLSX_MIME
+    )
+    st.download_button(
+        label="Download CSV File",
+        data=export_data(saved, "csv", csv_bytes),
+        file_name="youtube_title_scan_results.csv",
+        mime="text/csv"
+    )
+    if parquet_available():
+        st.download_button(
+            label="Download Parquet File",
+            data=export_data(saved, "parquet", parquet_bytes),
+            file_name="youtube_title_scan_results.parquet",
+            mime="application/vnd.apache.parquet"
+        )
+
+
+def render_metrics_panel():
+    """Show the collected stage timings and counters in the sidebar."""
+    st.sidebar.subheader("Performance metrics")
+    if st.sidebar.button("Reset metrics"):
+        metrics.reset()
+    snapshot = metrics.snapshot()
+    if not snapshot["timers"] and not snapshot["counters"]:
+        st.sidebar.caption("Run a scan to collect metrics.")
+        return
+    timers = pd.DataFrame(
+        [
+            {
+                "Stage": name,
+                "Calls": stats["count"],
+                "Total (s)": stats["total_seconds"],
+                "Max (s)": stats["max_seconds"],
+            }
+            for name, stats in snapshot["timers"].items()
+        ]
+    )
+    st.sidebar.dataframe(timers, hide_index=True, use_container_width=True)
+    counters = pd.DataFrame([{"Counter": name, "Total": total} for name, total in snapshot["counters"].items()])
+    st.sidebar.dataframe(counters, hide_index=True, use_container_width=True)
+    st.sidebar.download_button("Download JSON", metrics.to_json(), file_name="metrics.json", mime="application/json")
+    st.sidebar.download_button(
+        "Download Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain"
+    )
+
+
+show_metrics = st.sidebar.checkbox("Collect performance metrics", key="show_metrics")
+if show_metrics:
+    metrics.enable()
+else:
+    metrics.disable()
+
+scan_tab, search_tab = st.tabs(["Scan", "Search history"])
+
+with scan_tab:
+    channel_id = st.text_input("Enter the YouTube Channel ID (e.g., UC_x5XG1OV2P6uZZ5FSM9Ttw)").strip()
+    whole_channel = st.checkbox("Scan every upload", help="Large channels can take a few minutes the first time.")
+    max_results = st.number_input(
+        "Maximum number of titles to fetch", min_value=1, value=100, disabled=whole_channel
+    )
+    max_results = None if whole_channel else int(max_results)
+    details = st.checkbox(
+        "Also scan descriptions and tags",
+        help="Scores each video's description and tags separately. Uses one more API call per 50 videos.",
+    )
+    scan_column, refresh_column = st.columns(2)
+    scan_button = scan_column.button("Scan Titles", disabled=not api_key)
+    refresh_button = refresh_column.button(
+        "Refresh from YouTube",
+        disabled=not api_key,
+        help="Fetch the latest titles even if this channel was scanned recently.",
+    )
+
     try:
-        return data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-    except (KeyError, IndexError):
-        return None
+        # Parsed, normalized and compiled once per process; only
+        # reloaded when one of the CSV files changes on disk.
+        lexicon = load_lexicon()
+        cache = get_result_cache()
+        saved = st.session_state.get("scan")
+        if scan_button or refresh_button:
+            if not channel_id:
+                st.warning("Enter a YouTube Channel ID to scan.")
+            elif refresh_button or saved is None or saved["key"] != (channel_id, max_results, lexicon.version, details):
+                logger.debug("Using lexicon version %s", lexicon.version)
+                rescore_stored_results(lexicon.version, lexicon)
+                rows = []
+                if not refresh_button and titles_are_fresh(channel_id, max_results, details):
+                    rows = score_channel(get_title_store(), channel_id, lexicon, max_results, cache, details)
+                if not rows:
+                    rows = scan_from_api(get_youtube_client(api_key), channel_id, lexicon, max_results, cache, details)
 
-def fetch_video_titles(api_key, uploads_playlist_id, max_results):
-    titles = []
-    page_token = ""
-    while len(titles) < max_results:
-        url = f"https://www.googleapis.com/youtube/v3/playlistItems?key={api_key}&playlistId={uploads_playlist_id}&part=snippet&maxResults=50&pageToken={page_token}"
-        try:
-            response = requests.get(url, timeout=10)
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error("Error fetching playlist items: %s", e)
-            break
-        for item in data.get("items", []):
-            titles.append(item["snippet"]["title"])
-        page_token = data.get("nextPageToken", "")
-        if not page_token:
-            break
-    return titles[:max_results]
-
-if scan_button:
-    if not channel_id:
-        st.warning("Enter a YouTube Channel ID to scan.")
-    else:
-        try:
-            st.info("Fetching video titles...")
-            uploads_playlist_id = get_uploads_playlist_id(api_key, channel_id)
-            if not uploads_playlist_id:
-                st.error("Failed to retrieve uploads playlist. Check Channel ID.")
-            else:
-                titles = fetch_video_titles(api_key, uploads_playlist_id, max_results)
-                if not titles:
+                if rows is None:
+                    st.session_state.pop("scan", None)
+                    st.error("Failed to retrieve uploads playlist. Check Channel ID.")
+                elif not rows:
+                    st.session_state.pop("scan", None)
                     st.warning("No titles found or API quota exceeded.")
                 else:
-                    df_keywords = pd.read_csv("updated_keywords_expanded.csv")
-
-                    # The CSV already contains a 'keyword' column. Renaming
-                    # 'Flagged Keyword' blindly would create duplicate column
-                    # names which causes `DataFrame` objects to appear when
-                    # accessing `df_keywords['keyword']`. This leads to errors
-                    # when calling Series string methods. Preserve a single
-                    # 'keyword' column instead.
-                    if "Flagged Keyword" in df_keywords.columns:
-                        if "keyword" not in df_keywords.columns:
-                            df_keywords.rename(columns={"Flagged Keyword": "keyword"}, inplace=True)
-                        else:
-                            df_keywords["keyword"] = df_keywords["Flagged Keyword"].fillna(df_keywords["keyword"])
-                            df_keywords.drop(columns=["Flagged Keyword"], inplace=True)
-                    
-                    df_severity = pd.read_csv("safety_severity_scores.csv", encoding="utf-8-sig")
-
-                    # DEBUG: Log original column names
-                    logger.debug("Raw df_severity.columns = %s", df_severity.columns.tolist())
-
-                    # Clean up whitespace and stray characters
-                    df_severity.columns = df_severity.columns.str.strip().str.replace('"', '').str.replace("'", '')
-
-                    # DEBUG: Log cleaned column names
-                    logger.debug("Cleaned df_severity.columns = %s", df_severity.columns.tolist())
-
-                    # Safely rename columns if they exist
-                    if "Keyword" in df_severity.columns:
-                        df_severity.rename(columns={"Keyword": "keyword"}, inplace=True)
-                    if "SeverityScoreDeduction" in df_severity.columns:
-                        df_severity.rename(columns={"SeverityScoreDeduction": "severity"}, inplace=True)
-
-                    # Continue with filtering
-                    df_severity = df_severity[df_severity['keyword'].notna()]
-                    df_severity['keyword'] = df_severity['keyword'].astype(str).str.lower()
-
-                    df_results = scan_titles_weighted(titles, df_keywords, df_severity)
-                    # Sort results by Safety Score (ascending)
-                    df_results = df_results.sort_values(by="Safety Score")
-
-                    # Apply color scaling to Safety Score column
-                    styled_df = df_results.style.background_gradient(
-                        cmap="RdYlGn", subset=["Safety Score"]
-                    )
-
-                    st.success("Scan complete!")
-                    st.markdown("<div class='results-table'>", unsafe_allow_html=True)
-                    st.dataframe(styled_df, use_container_width=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-
-                    from io import BytesIO
-                    from openpyxl.utils import get_column_letter
-                    from openpyxl.styles import Font
-                    from openpyxl.formatting.rule import ColorScaleRule
-
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        df_results.to_excel(writer, index=False, sheet_name='Scan Results')
-                        workbook = writer.book
-                        worksheet = writer.sheets['Scan Results']
-
-                        # Set column widths and font size
-                        for idx, col in enumerate(df_results.columns, 1):
-                            worksheet.column_dimensions[get_column_letter(idx)].width = 25
-                        for row in worksheet.iter_rows():
-                            for cell in row:
-                                cell.font = Font(size=14)
-
-                        # Apply color scale to Safety Score column
-                        score_idx = df_results.columns.get_loc('Safety Score') + 1
-                        score_letter = get_column_letter(score_idx)
-                        rule = ColorScaleRule(start_type='min', start_color='FF0000', end_type='max', end_color='00FF00')
-                        worksheet.conditional_formatting.add(
-                            f'{score_letter}2:{score_letter}{len(df_results)+1}', rule)
-
-                    st.download_button(
-                        label="Download Excel File",
-                        data=output.getvalue(),
-                        file_name="youtube_title_scan_results.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-        except Exception as e:
-            st.error(f"Something went wrong: {e}")
+                    save_scan((channel_id, max_results, lexicon.version, details), rows)
+        elif saved is not None and saved["key"][2] != lexicon.version:
+            # The lexicon changed since the scan; re-score from the store
+            # without calling the API.
+            rescore_stored_results(lexicon.version, lexicon)
+            saved_channel_id, saved_max_results, _, saved_details = saved["key"]
+            save_scan(
+                (saved_channel_id, saved_max_results, lexicon.version, saved_details),
+                score_channel(get_title_store(), saved_channel_id, lexicon, saved_max_results, cache, saved_details),
+            )
+
+        saved = st.session_state.get("scan")
+        if saved is not None:
+            render_scan(saved, cache)
+    except Exception as e:
+        st.error(f"Something went wrong: {e}")
+
+with search_tab:
+    st.caption("Search the results of every earlier scan without fetching anything.")
+    search_keyword = st.text_input("Flagged keyword", key="search_keyword").strip()
+    search_category = st.selectbox("Category", ["Any", *known_categories(load_lexicon())], key="search_category")
+    search_channel = st.text_input("Channel ID", key="search_channel").strip()
+    min_score, max_score = st.slider("Safety Score", min_value=0, max_value=100, value=(0, 100), key="search_score")
+    search_limit = st.number_input(
+        "Maximum number of rows", min_value=1, max_value=MAX_SEARCH_ROWS, value=100, key="search_limit"
+    )
+
+    if st.button("Search", key="search_button"):
+        found = get_title_store().search(
+            keyword=search_keyword or None,
+            category=None if search_category == "Any" else search_category,
+            channel_id=search_channel or None,
+            min_score=min_score,
+            max_score=max_score,
+            limit=int(search_limit),
+        )
+        if found:
+            st.caption(f"{len(found)} matching videos, lowest Safety Score first")
+            st.dataframe(pd.DataFrame(found), use_container_width=True)
+        else:
+            st.info("No stored results match these filters.")
+
+if show_metrics:
+    render_metrics_panel()
@@ -1,9 +1,10 @@
 import os
 from dotenv import load_dotenv
 import streamlit as st
-import pandas as pd
-import requests
 from scan_titles_weighted_contextual_v3_riskaware import scan_titles_weighted
+from lexicon import load_lexicon
+from report_export import XLSX_MIME, csv_bytes, parquet_available, parquet_bytes, xlsx_bytes
+from youtube_client import YouTubeClient
 
 # Load variables from .env if present
 load_dotenv()
@@ -16,10 +17,10 @@ st.markdown(
     f"""
     <style>
         @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;800&display=swap');
-        body {
+        body {{
             background-color: #0E1117;
             color: #FFFFFF;
-        }
+        }}
         .branded-content {{
             font-family: 'Montserrat', sans-serif;
         }}
@@ -68,41 +69,19 @@ api_key = st.text_input(
 channel_id = st.text_input("Enter the YouTube Channel ID (e.g., UC_x5XG1OV2P6uZZ5FSM9Ttw)")
 max_results = st.number_input("Maximum number of titles to fetch", min_value=1, max_value=500, value=100)
 
-def get_uploads_playlist_id(api_key, channel_id):
-    url = f"https://www.googleapis.com/youtube/v3/channels?part=contentDetails&id={channel_id}&key={api_key}"
-    response = requests.get(url).json()
-    try:
-        return response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-    except (KeyError, IndexError):
-        return None
-
-def fetch_video_titles(api_key, uploads_playlist_id, max_results):
-    titles = []
-    page_token = ""
-    while len(titles) < max_results:
-        url = f"https://www.googleapis.com/youtube/v3/playlistItems?key={api_key}&playlistId={uploads_playlist_id}&part=snippet&maxResults=50&pageToken={page_token}"
-        response = requests.get(url).json()
-        for item in response.get("items", []):
-            titles.append(item["snippet"]["title"])
-        page_token = response.get("nextPageToken", "")
-        if not page_token:
-            break
-    return titles[:max_results]
-
 if st.button("Scan Titles") and api_key and channel_id:
     try:
         st.info("Fetching video titles...")
-        uploads_playlist_id = get_uploads_playlist_id(api_key, channel_id)
+        client = YouTubeClient(api_key)
+        uploads_playlist_id = client.get_uploads_playlist_id(channel_id)
         if not uploads_playlist_id:
             st.error("Failed to retrieve uploads playlist. Check Channel ID.")
         else:
-            titles = fetch_video_titles(api_key, uploads_playlist_id, max_results)
+            titles = client.fetch_video_titles(uploads_playlist_id, max_results)
             if not titles:
                 st.warning("No titles found or API quota exceeded.")
             else:
-                df_keywords = pd.read_csv("updated_keywords_expanded.csv")
-                df_severity = pd.read_csv("safety_severity_scores.csv")
-                df_results = scan_titles_weighted(titles, df_keywords, df_severity)
+                df_results = scan_titles_weighted(titles, lexicon=load_lexicon())
                 df_results = df_results.sort_values(by="Safety Score")
                 styled_df = df_results.style.background_gradient(
                     cmap="RdYlGn", subset=["Safety Score"]
@@ -112,38 +91,26 @@ if st.button("Scan Titles") and api_key and channel_id:
                 st.dataframe(styled_df, use_container_width=True)
                 st.markdown("</div>", unsafe_allow_html=True)
 
-                # ✅ Excel download block
-                from io import BytesIO
-                from openpyxl.utils import get_column_letter
-                from openpyxl.styles import Font
-                from openpyxl.formatting.rule import ColorScaleRule
-
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df_results.to_excel(writer, index=False, sheet_name='Scan Results')
-                    workbook = writer.book
-                    worksheet = writer.sheets['Scan Results']
-
-                    # Set column widths and font size
-                    for idx, col in enumerate(df_results.columns, 1):
-                        worksheet.column_dimensions[get_column_letter(idx)].width = 25
-                    for row in worksheet.iter_rows():
-                        for cell in row:
-                            cell.font = Font(size=14)
-
-                    # Apply color scale to Safety Score column
-                    score_idx = df_results.columns.get_loc('Safety Score') + 1
-                    score_letter = get_column_letter(score_idx)
-                    rule = ColorScaleRule(start_type='min', start_color='FF0000', end_type='max', end_color='00FF00')
-                    worksheet.conditional_formatting.add(
-                        f'{score_letter}2:{score_letter}{len(df_results)+1}', rule)
-
+                # ✅ Download block
                 st.download_button(
                     label="Download Excel File",
-                    data=output.getvalue(),
+                    data=xlsx_bytes(df_results),
                     file_name="youtube_title_scan_results.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    mime=XLSX_MIME
+                )
+                st.download_button(
+                    label="Download CSV File",
+                    data=csv_bytes(df_results),
+                    file_name="youtube_title_scan_results.csv",
+                    mime="text/csv"
                 )
+                if parquet_available():
+                    st.download_button(
+                        label="Download Parquet File",
+                        data=parquet_bytes(df_results),
+                        file_name="youtube_title_scan_results.parquet",
+                        mime="application/vnd.apache.parquet"
+                    )
     except Exception as e:
         st.error(f"Something went wrong: {e}")
 
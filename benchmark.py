@@ -0,0 +1,315 @@
+"""Reproducible benchmarks for the scanners, the rule checks and the Excel export.
+
+Example:
+    python benchmark.py --titles 1000 100000 --keywords 80 5000 --out bench.json
+    python benchmark.py --titles 1000 100000 --keywords 80 5000 --baseline bench.json
+
+The legacy `scan_titles_weighted.py` scanner checks every keyword with
+`iterrows` per title, so it only gets the first `--legacy-limit` titles.
+Peak memory is what `tracemalloc` sees, which leaves out allocations made
+inside C extensions such as lxml.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import scan_titles_weighted as legacy_scanner
+from lexicon import KEYWORDS_PATH, SEVERITY_PATH, Lexicon
+from report_export import xlsx_bytes
+from rule_registry import PHRASE_RULES, TONE_RULES
+from scan_core import scan_titles, scanner_for
+from scan_titles_weighted_contextual_v3_riskaware import scan_titles_batch, scan_titles_weighted, score_title
+
+logger = logging.getLogger("benchmark")
+
+BENCHMARKS = ("legacy", "contextual", "core", "batch", "rules", "export")
+
+# Text that trips the phrase and tone rules in risk_rules.csv
+RISKY_PHRASES = [
+    "you won't believe", "gone wrong", "get rich quick", "earn $500", "act now",
+    "miracle cure", "100% success", "limited time", "before it's too late",
+]
+TONE_WORDS = ["hate", "rage", "panic", "scared", "insane", "unbelievable", "alone", "crying"]
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "dor", "tis", "bel", "qua", "zen", "por", "shu", "ix", "nel", "tro"]
+_CATEGORIES = ["profanity", "violence", "drugs", "mental health", "financial", "clickbait"]
+
+# One run of a benchmark: `run` processes every item, `score_one` (if any)
+# handles a single title so its latency can be timed.
+Case = namedtuple("Case", ["name", "items", "keywords", "run", "score_one"])
+
+
+def _synthetic_word(rnd):
+    return "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 4)))
+
+
+def synthetic_lexicon(n_keywords, seed=0):
+    """Return (df_keywords, df_severity) with `n_keywords` keyword rows.
+
+    The shipped lexicon comes first; the rest are made-up words and two-word
+    phrases with random categories and severities.
+    """
+    df_keywords = pd.read_csv(KEYWORDS_PATH)
+    df_severity = pd.read_csv(SEVERITY_PATH)
+    rnd = random.Random(seed)
+    seen = set(df_keywords["keyword"].str.lower())
+    keyword_rows = []
+    severity_rows = []
+    while len(df_keywords) + len(keyword_rows) < n_keywords:
+        keyword = _synthetic_word(rnd)
+        if rnd.random() < 0.2:
+            keyword = f"{keyword} {_synthetic_word(rnd)}"
+        if keyword in seen:
+            continue
+        seen.add(keyword)
+        keyword_rows.append({
+            "keyword": keyword,
+            "context": "Synthetic keyword",
+            "category": rnd.choice(_CATEGORIES),
+            "Less Harsh Keyword": _synthetic_word(rnd),
+            "Alternative Keyword": _synthetic_word(rnd),
+            "Opposite Keyword": _synthetic_word(rnd),
+        })
+        severity_rows.append({"Keyword": keyword, "SeverityScoreDeduction": rnd.randint(5, 40)})
+
+    df_keywords = pd.concat([df_keywords, pd.DataFrame(keyword_rows)], ignore_index=True).head(n_keywords)
+    df_severity = pd.concat([df_severity, pd.DataFrame(severity_rows)], ignore_index=True)
+    return df_keywords, df_severity
+
+
+def synthetic_titles(n_titles, keywords, seed=0, hit_rate=0.3):
+    """Generate `n_titles` titles in which about `hit_rate` of them contain a keyword."""
+    rnd = random.Random(seed)
+    filler = [_synthetic_word(rnd) for _ in range(2000)]
+    keywords = list(keywords)
+    titles = []
+    for _ in range(n_titles):
+        words = [rnd.choice(filler) for _ in range(rnd.randint(4, 12))]
+        if keywords and rnd.random() < hit_rate:
+            for _ in range(rnd.randint(1, 2)):
+                words.insert(rnd.randrange(len(words) + 1), rnd.choice(keywords))
+        if rnd.random() < 0.1:
+            words.insert(rnd.randrange(len(words) + 1), rnd.choice(RISKY_PHRASES))
+        if rnd.random() < 0.05:
+            words.insert(rnd.randrange(len(words) + 1), rnd.choice(TONE_WORDS))
+        title = " ".join(words)
+        titles.append(title.title() if rnd.random() < 0.3 else title)
+    return titles
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _check_rules(lower_title):
+    PHRASE_RULES.match(lower_title)
+    TONE_RULES.match(lower_title)
+
+
+def build_cases(titles, df_keywords, df_severity, benchmarks, legacy_limit, export_limit, include_shared):
+    """Return the `Case`s for one corpus and lexicon.
+
+    Rule checks and the export do not depend on the lexicon size, so they are
+    only included when `include_shared` is set.
+    """
+    lexicon = Lexicon.from_frames(df_keywords, df_severity)
+    n_keywords = len(df_keywords)
+    cases = []
+    if "legacy" in benchmarks:
+        df_mapping = df_keywords.rename(columns={"keyword": "Flagged Keyword"})
+        items = titles[:legacy_limit]
+        cases.append(Case(
+            "legacy", items, n_keywords,
+            lambda: legacy_scanner.scan_titles_weighted(items, df_mapping, df_severity),
+            lambda title: legacy_scanner.scan_titles_weighted([title], df_mapping, df_severity),
+        ))
+    if "contextual" in benchmarks:
+        cases.append(Case(
+            "contextual", titles, n_keywords,
+            lambda: scan_titles_weighted(titles, lexicon=lexicon),
+            lambda title: score_title(title, lexicon),
+        ))
+    if "core" in benchmarks:
+        scanner = scanner_for(lexicon)
+        cases.append(Case("core", titles, n_keywords, lambda: scan_titles(titles, lexicon), scanner.scan_title))
+    if "batch" in benchmarks:
+        series = pd.Series(titles, dtype=object)
+        cases.append(Case("batch", titles, n_keywords, lambda: scan_titles_batch(series, lexicon=lexicon), None))
+    if include_shared and "rules" in benchmarks:
+        lowered = [title.lower() for title in titles]
+        cases.append(Case(
+            "rules", lowered, None,
+            lambda: [_check_rules(title) for title in lowered],
+            _check_rules,
+        ))
+    if include_shared and "export" in benchmarks:
+        results = scan_titles_batch(pd.Series(titles[:export_limit], dtype=object), lexicon=lexicon).results
+        cases.append(Case("export", results.index, None, lambda: xlsx_bytes(results), None))
+    return cases
+
+
+def run_case(case, sample, memory=True):
+    """Time one `Case` and return its result record."""
+    gc.collect()
+    start = time.perf_counter()
+    case.run()
+    seconds = time.perf_counter() - start
+
+    timings = []
+    if case.score_one is not None:
+        for item in case.items[:sample]:
+            item_start = time.perf_counter()
+            case.score_one(item)
+            timings.append(time.perf_counter() - item_start)
+        timings.sort()
+
+    peak = None
+    if memory:
+        # A separate pass, since tracing slows the run down considerably
+        gc.collect()
+        tracemalloc.start()
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    count = len(case.items)
+    p50 = _percentile(timings, 0.5)
+    p99 = _percentile(timings, 0.99)
+    return {
+        "benchmark": case.name,
+        "titles": count,
+        "keywords": case.keywords,
+        "seconds": round(seconds, 4),
+        "titles_per_sec": round(count / seconds, 1) if seconds else None,
+        "p50_ms": None if p50 is None else round(p50 * 1000, 4),
+        "p99_ms": None if p99 is None else round(p99 * 1000, 4),
+        "peak_memory_mib": None if peak is None else round(peak / 2**20, 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(title_counts, keyword_counts, benchmarks=BENCHMARKS, sample=1000, legacy_limit=50,
+                   export_limit=20_000, memory=True, seed=0):
+    """Run every benchmark over each corpus and lexicon size and return a report dict."""
+    results = []
+    for n_keywords in keyword_counts:
+        df_keywords, df_severity = synthetic_lexicon(n_keywords, seed)
+        keywords = df_keywords["keyword"].str.lower().tolist()
+        for n_titles in title_counts:
+            titles = synthetic_titles(n_titles, keywords, seed)
+            include_shared = n_keywords == keyword_counts[0]
+            for case in build_cases(titles, df_keywords, df_severity, benchmarks, legacy_limit, export_limit,
+                                    include_shared):
+                record = run_case(case, sample, memory)
+                logger.info(
+                    "%-10s titles=%-8d keywords=%-6s %10s titles/s  p50=%s ms  p99=%s ms  peak=%s MiB",
+                    record["benchmark"], record["titles"], record["keywords"], record["titles_per_sec"],
+                    record["p50_ms"], record["p99_ms"], record["peak_memory_mib"],
+                )
+                results.append(record)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "config": {
+            "seed": seed,
+            "sample": sample,
+            "legacy_limit": legacy_limit,
+            "export_limit": export_limit,
+            "memory": memory,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.1):
+    """Return (record, baseline record) pairs whose throughput dropped by more than `tolerance`."""
+    previous = {(r["benchmark"], r["titles"], r["keywords"]): r for r in baseline["results"]}
+    regressions = []
+    for record in report["results"]:
+        before = previous.get((record["benchmark"], record["titles"], record["keywords"]))
+        if before is None or not before["titles_per_sec"] or not record["titles_per_sec"]:
+            continue
+        if record["titles_per_sec"] < before["titles_per_sec"] * (1 - tolerance):
+            regressions.append((record, before))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="benchmark", description="Benchmark the scanning and export pipeline.")
+    parser.add_argument("--titles", type=int, nargs="+", default=[1000, 10_000],
+                        help="Corpus sizes to scan (default: 1000 10000).")
+    parser.add_argument("--keywords", type=int, nargs="+", default=[80, 1000],
+                        help="Lexicon sizes to scan with (default: 80 1000).")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument("--sample", type=int, default=1000, help="Titles timed one by one for p50/p99 (default: 1000).")
+    parser.add_argument("--legacy-limit", type=int, default=50,
+                        help="Titles given to the legacy iterrows scanner (default: 50).")
+    parser.add_argument("--export-limit", type=int, default=20_000, help="Rows written to Excel (default: 20000).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory pass.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpora (default: 0).")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare throughput against.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed throughput drop against --baseline (default: 0.1).")
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = build_parser().parse_args(argv)
+    report = run_benchmarks(
+        args.titles, args.keywords, args.only, args.sample, args.legacy_limit, args.export_limit,
+        not args.no_memory, args.seed,
+    )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        logger.info("Wrote %s", args.out)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for record, before in regressions:
+            logger.warning(
+                "Regression: %s titles=%d keywords=%s %.1f -> %.1f titles/s",
+                record["benchmark"], record["titles"], record["keywords"],
+                before["titles_per_sec"], record["titles_per_sec"],
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import re
+from collections import namedtuple
+
+import text_normalizer
+from text_normalizer import WILDCARD
+
+_END = None
+_WORD_RUN = re.compile(r"\w+")
+# In a normalized text a `*` between word characters masks one letter
+_MASKED_RUN = re.compile(r"\w+(?:\*+\w+)+")
+_NORMALIZED_RUN = re.compile(r"\w+(?:\*+\w+)*")
+
+TokenTables = namedtuple("TokenTables", ["words", "phrases", "always_walk"])
+
+
+def word_tokens(text):
+    """Return the distinct runs of word characters in `text`.
+
+    Every such run of a keyword is also a whole run of any text the keyword
+    matches, so the tokens of a title are enough to rule keywords out.
+    """
+    return set(_WORD_RUN.findall(text))
+
+
+def text_tokens(text):
+    """Return the tokens of `text` and of its normalized form, plus `*` if a word in it is masked.
+
+    Whenever a `KeywordMatcher` finds a keyword in `text`, one of the token
+    sets `keyword_tokens` returns for that keyword is a subset of these.
+    """
+    tokens = word_tokens(text)
+    normalized = text_normalizer.normalize(text)
+    if normalized is not None:
+        tokens |= word_tokens(normalized.text)
+        if _MASKED_RUN.search(normalized.text):
+            tokens.add(WILDCARD)
+    return tokens
+
+
+def keyword_tokens(keyword):
+    """Return the token sets that reveal a possible match of `keyword` among `text_tokens`."""
+    token_sets = [word_tokens(keyword), {WILDCARD}]
+    normalized = text_normalizer.normalize(keyword)
+    if normalized is not None:
+        token_sets.append(word_tokens(normalized.text))
+    return token_sets
+
+
+class KeywordMatcher:
+    """Word-boundary-aware trie that finds every keyword in a text in one pass.
+
+    A keyword matches exactly when `re.search(rf'\\b{re.escape(keyword)}\\b', text)`
+    would, but the cost of a scan depends on the length of the text and the
+    longest keyword rather than on the number of keywords.
+
+    With `normalize`, a keyword also matches when the `text_normalizer` form
+    of the text contains the normalized keyword, so "sh1t", "f*ck" and
+    "f u c k" are found as well. A masked word counts as one keyword, the
+    first in lexicon order that fits it. Texts that normalizing leaves
+    unchanged are only walked once.
+    """
+
+    def __init__(self, keywords, normalize=True):
+        self.keywords = list(keywords)
+        self._root = {}
+        self._positions = {}
+        # A keyword that is one run of word characters occurs exactly when it
+        # is one of the text's tokens; the rest are grouped by their tokens so
+        # the trie is only walked when all of some keyword's tokens are present.
+        self._words = set()
+        self._phrases = {}
+        self._always_walk = False
+        for idx, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            self._positions.setdefault(keyword, []).append(idx)
+            node = self._root
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[_END] = keyword
+            tokens = _WORD_RUN.findall(keyword)
+            if len(tokens) == 1 and tokens[0] == keyword:
+                self._words.add(keyword)
+            elif tokens:
+                self._phrases.setdefault(tokens[0], []).append(frozenset(tokens))
+            else:
+                self._always_walk = True
+
+        # Normalized keywords, each mapped back to the keywords it came from
+        self._variants = {}
+        self._normalized = None
+        if normalize:
+            for keyword in self._positions:
+                normalized = text_normalizer.normalize(keyword)
+                variant = keyword if normalized is None else normalized.text
+                self._variants.setdefault(variant, []).append(keyword)
+            self._normalized = KeywordMatcher(self._variants, normalize=False)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find_keywords(self, text, normalize=True):
+        """Return the set of distinct keywords that occur in `text`.
+
+        Without `normalize`, only keywords written as they are in `text` count.
+        """
+        found = self._find(text)
+        if normalize and self._normalized is not None:
+            normalized = text_normalizer.normalize(text)
+            if normalized is not None:
+                for variant in self._normalized._find(normalized.text, masked=True):
+                    found.update(self._variants[variant])
+        return found
+
+    def _find(self, text, masked=False):
+        if masked and WILDCARD in text:
+            return {keyword for keyword, _, _ in self._iter_unmasked(text)}
+        tokens = word_tokens(text)
+        found = self._words & tokens
+        if self._always_walk or any(
+            phrase <= tokens
+            for first in self._phrases.keys() & tokens
+            for phrase in self._phrases[first]
+        ):
+            found.update(keyword for keyword, _, _ in self._iter_matches(text))
+        return found
+
+    def _iter_matches(self, text, masked=False):
+        # Yield (keyword, start, end) for every occurrence. With `masked`, a
+        # `*` inside a word matches any one character.
+        root = self._root
+        length = len(text)
+        # `\b` holds exactly at the edges of runs of word characters, and
+        # every keyword has to start and end on one of them.
+        boundaries = set()
+        wildcards = set()
+        for run in (_NORMALIZED_RUN if masked else _WORD_RUN).finditer(text):
+            boundaries.add(run.start())
+            boundaries.add(run.end())
+            if masked:
+                wildcards.update(pos for pos in range(run.start(), run.end()) if text[pos] == WILDCARD)
+        for start in sorted(boundaries):
+            if start == length:
+                break
+            if not wildcards:
+                node = root.get(text[start])
+                pos = start
+                while node is not None:
+                    pos += 1
+                    keyword = node.get(_END)
+                    if keyword is not None and pos in boundaries:
+                        yield keyword, start, pos
+                    if pos == length:
+                        break
+                    node = node.get(text[pos])
+                continue
+            # Each wildcard branches into every child of the node it reaches
+            pending = [(root, start)]
+            while pending:
+                node, pos = pending.pop()
+                if pos in wildcards:
+                    children = [child for char, child in node.items() if char is not _END]
+                else:
+                    child = node.get(text[pos])
+                    children = () if child is None else (child,)
+                pos += 1
+                for child in children:
+                    keyword = child.get(_END)
+                    if keyword is not None and pos in boundaries:
+                        yield keyword, start, pos
+                    if pos < length:
+                        pending.append((child, pos))
+
+    def _iter_unmasked(self, text):
+        # `_iter_matches` with wildcards, except that a span with a masked
+        # letter stands for one keyword only: the first, in keyword order, of
+        # those it fits. "s**t" is "shit" or "slut", never both.
+        positions = self._positions
+        chosen = {}
+        for keyword, start, end in self._iter_matches(text, masked=True):
+            if WILDCARD not in text[start:end]:
+                yield keyword, start, end
+            elif (start, end) not in chosen or positions[keyword][0] < positions[chosen[start, end]][0]:
+                chosen[start, end] = keyword
+        for (start, end), keyword in chosen.items():
+            yield keyword, start, end
+
+    def token_tables(self, normalized=False):
+        """Return the `TokenTables` that let `find_keywords` settle a text from its tokens.
+
+        `words` maps each keyword that is a single run of word characters to
+        its indices; it occurs exactly when it is one of the text's tokens.
+        `phrases` holds the token sets of the other keywords: only a text with
+        every token of one of them needs the trie, and with `always_walk`
+        every text does. Disguised keywords are not covered; a text that
+        `text_normalizer.CHANGEABLE` finds nothing in has none.
+
+        With `normalized`, the tables are those of the normalized keywords,
+        to be applied to the text `text_normalizer.normalize` returns; `words`
+        still maps to indices of the original keywords. A normalized text
+        with a `*` left in it has to go through `find_keywords`.
+        """
+        matcher = self
+        words = {word: self._positions[word] for word in self._words}
+        if normalized:
+            if self._normalized is None:
+                raise ValueError("This KeywordMatcher was built without normalize")
+            matcher = self._normalized
+            words = {
+                word: sorted(idx for keyword in self._variants[word] for idx in self._positions[keyword])
+                for word in matcher._words
+            }
+        return TokenTables(
+            words=words,
+            phrases=[tokens for group in matcher._phrases.values() for tokens in group],
+            always_walk=matcher._always_walk,
+        )
+
+    def match(self, text, normalize=True):
+        """Return the indices of every matching keyword, in lexicon order.
+
+        Duplicate keywords each report their own index, so callers iterating
+        the result see the same rows a per-keyword `re.search` loop would.
+        `normalize` is passed on to `find_keywords`.
+        """
+        found = self.find_keywords(text, normalize)
+        if not found:
+            return []
+        return sorted(idx for keyword in found for idx in self._positions[keyword])
+
+    def find_spans(self, text):
+        """Return (keyword, start, end) for every occurrence of a keyword in `text`.
+
+        `text` is taken as written rather than lowercased, and the offsets
+        index it, so an obfuscated occurrence reports the characters it was
+        written with. Spans are sorted by position.
+        """
+        normalized = None if self._normalized is None else text_normalizer.normalize(text)
+        return self._spans(text, normalized)
+
+    def _spans(self, text, normalized):
+        lower = text.lower()
+        positions = None
+        if len(lower) != len(text):
+            positions = [idx for idx, char in enumerate(text) for _ in char.lower()]
+        spans = set()
+        for keyword, start, end in self._iter_matches(lower):
+            if positions is not None:
+                start, end = positions[start], positions[end - 1] + 1
+            spans.add((keyword, start, end))
+        if normalized is not None:
+            positions = normalized.positions
+            for variant, start, end in self._normalized._iter_unmasked(normalized.text):
+                for keyword in self._variants[variant]:
+                    spans.add((keyword, positions[start], positions[end - 1] + 1))
+        return sorted(spans, key=lambda span: (span[1], span[2], span[0]))
+
+    def find_disguised(self, text):
+        """Map each keyword that occurs in `text` only in disguise to how it is first written there."""
+        normalized = None if self._normalized is None else text_normalizer.normalize(text)
+        if normalized is None:
+            return {}
+        written = {}
+        plain = set()
+        for keyword, start, end in self._spans(text, normalized):
+            if text[start:end].lower() == keyword:
+                plain.add(keyword)
+            else:
+                written.setdefault(keyword, text[start:end])
+        return {keyword: form for keyword, form in written.items() if keyword not in plain}
@@ -0,0 +1,241 @@
+import csv
+import hashlib
+import logging
+import os
+import threading
+from collections import namedtuple
+
+import metrics
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+KEYWORDS_PATH = os.path.join(_BASE_DIR, "updated_keywords_expanded.csv")
+SEVERITY_PATH = os.path.join(_BASE_DIR, "safety_severity_scores.csv")
+
+LexiconEntry = namedtuple(
+    "LexiconEntry",
+    ["keyword", "context", "category", "severity", "less_harsh", "alternative", "opposite"],
+)
+
+# `changed` keywords were added, removed or edited beyond their severity;
+# `severity_deltas` maps keywords whose only edit is the severity to the
+# change in total deduction a matching title sees. `reordered` means the
+# surviving keywords moved relative to each other, which reorders text
+# columns of every title.
+LexiconDiff = namedtuple("LexiconDiff", ["changed", "severity_deltas", "reordered"])
+
+
+def _is_missing(value):
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pandas.NA refuses to be coerced to bool
+        return True
+
+
+def _suggestion(value):
+    return "-" if _is_missing(value) else str(value)
+
+
+_KEYWORD_COLUMNS = ['keyword', 'context', 'category', 'Less Harsh Keyword', 'Alternative Keyword', 'Opposite Keyword']
+
+
+def normalize_severity_columns(df_severity):
+    """Return `df_severity` with lowercase `keyword` and `severity` columns."""
+    df_severity = df_severity.rename(columns=lambda c: c.strip().lower())
+    if 'severityscorededuction' in df_severity.columns:
+        df_severity = df_severity.rename(columns={'severityscorededuction': 'severity'})
+
+    if 'keyword' not in df_severity.columns or 'severity' not in df_severity.columns:
+        raise ValueError("df_severity must contain 'keyword' and 'severity' columns")
+    return df_severity
+
+
+class Lexicon:
+    """Keyword table, severity scores and matcher compiled once for scanning.
+
+    Every keyword row becomes a `LexiconEntry` carrying its context, category,
+    severity and the three suggestions, so a hit resolves to one lookup
+    instead of a DataFrame filter.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.matcher = KeywordMatcher(entry.keyword for entry in self.entries)
+        self.index = {}
+        for entry in self.entries:
+            self.index.setdefault(entry.keyword, []).append(entry)
+        digest = hashlib.sha256()
+        for entry in self.entries:
+            digest.update("\x1f".join(map(str, entry)).encode("utf-8") + b"\x1e")
+        # Content-derived, so any edit to a keyword row or severity changes it
+        self.version = digest.hexdigest()[:12]
+
+    @classmethod
+    def from_frames(cls, df_keywords, df_severity):
+        if 'keyword' not in df_keywords.columns:
+            raise ValueError("df_keywords must contain a 'keyword' column")
+        df_severity = normalize_severity_columns(df_severity)
+
+        def column(name):
+            if name in df_keywords.columns:
+                return df_keywords[name].tolist()
+            return [None] * len(df_keywords)
+
+        keyword_rows = [
+            dict(zip(_KEYWORD_COLUMNS, values))
+            for values in zip(*(column(name) for name in _KEYWORD_COLUMNS))
+        ]
+        severity_rows = zip(df_severity['keyword'].tolist(), df_severity['severity'].tolist())
+        return cls.from_records(keyword_rows, severity_rows)
+
+    @classmethod
+    def from_records(cls, keyword_rows, severity_rows):
+        """Build a lexicon from keyword row dicts and (keyword, severity) pairs."""
+        severity_lookup = {}
+        for keyword, severity in severity_rows:
+            # The first row for a keyword wins, as it did with DataFrame filtering;
+            # a blank severity in a DataFrame arrives as NaN and means none
+            severity_lookup.setdefault(str(keyword).lower(), None if _is_missing(severity) else severity)
+
+        entries = []
+        for row in keyword_rows:
+            keyword = str(row.get('keyword')).lower()
+            context = row.get('context')
+            category = row.get('category')
+            entries.append(LexiconEntry(
+                keyword=keyword,
+                context=None if _is_missing(context) else context,
+                category=None if _is_missing(category) else category,
+                severity=severity_lookup.get(keyword),
+                less_harsh=_suggestion(row.get('Less Harsh Keyword')),
+                alternative=_suggestion(row.get('Alternative Keyword')),
+                opposite=_suggestion(row.get('Opposite Keyword')),
+            ))
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, lower_title):
+        """Return the entries whose keyword occurs in `lower_title`, in lexicon order."""
+        entries = self.entries
+        return [entries[idx] for idx in self.matcher.match(lower_title)]
+
+
+def _severity_value(severity):
+    return 0 if severity is None else severity
+
+
+def diff_lexicons(old, new):
+    """Compare two lexicons keyword by keyword and return a `LexiconDiff`."""
+    changed = set()
+    severity_deltas = {}
+    for keyword in old.index.keys() | new.index.keys():
+        old_entries = old.index.get(keyword, [])
+        new_entries = new.index.get(keyword, [])
+        if old_entries == new_entries:
+            continue
+        same_text = len(old_entries) == len(new_entries) and all(
+            before._replace(severity=None) == after._replace(severity=None)
+            for before, after in zip(old_entries, new_entries)
+        )
+        if same_text:
+            delta = sum(_severity_value(after.severity) - _severity_value(before.severity)
+                        for before, after in zip(old_entries, new_entries))
+            if delta:
+                severity_deltas[keyword] = delta
+        else:
+            changed.add(keyword)
+
+    # Rows of unchanged keywords must keep their relative order
+    old_order = [entry.keyword for entry in old.entries if entry.keyword not in changed]
+    new_order = [entry.keyword for entry in new.entries if entry.keyword not in changed]
+    return LexiconDiff(changed=changed, severity_deltas=severity_deltas, reordered=old_order != new_order)
+
+
+def _read_csv_rows(path):
+    # Empty cells are treated as missing, like pandas' NaN
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        header = [name.strip().replace('"', '').replace("'", '') for name in next(reader, [])]
+        for values in reader:
+            if values:
+                yield {name: (value if value != "" else None) for name, value in zip(header, values)}
+
+
+def _parse_severity(value):
+    if value is None:
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def read_lexicon(keywords_path=KEYWORDS_PATH, severity_path=SEVERITY_PATH):
+    """Parse and normalize the keyword and severity CSVs into a `Lexicon`."""
+    keyword_rows = []
+    for row in _read_csv_rows(keywords_path):
+        # Older exports name the keyword column 'Flagged Keyword'
+        flagged = row.pop("Flagged Keyword", None)
+        if flagged is not None or "keyword" not in row:
+            row["keyword"] = flagged if flagged is not None else row.get("keyword")
+        keyword_rows.append(row)
+
+    severity_rows = []
+    for row in _read_csv_rows(severity_path):
+        row = {name.strip().lower(): value for name, value in row.items()}
+        if "severityscorededuction" in row:
+            row["severity"] = row.pop("severityscorededuction")
+        if "keyword" not in row or "severity" not in row:
+            raise ValueError("df_severity must contain 'keyword' and 'severity' columns")
+        if row["keyword"] is None:
+            continue
+        severity_rows.append((row["keyword"], _parse_severity(row["severity"])))
+
+    return Lexicon.from_records(keyword_rows, severity_rows)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _content_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
+def load_lexicon(keywords_path=KEYWORDS_PATH, severity_path=SEVERITY_PATH):
+    """Return the compiled lexicon for the two CSVs, cached for the process.
+
+    The files are re-read only when their mtime or size changes, and the
+    lexicon is rebuilt only when their content hash changes as well.
+    """
+    paths = (os.path.abspath(keywords_path), os.path.abspath(severity_path))
+    with _cache_lock:
+        signature = tuple(_signature(path) for path in paths)
+        cached = _cache.get(paths)
+        if cached is not None and cached[0] == signature:
+            return cached[2]
+
+        content_hash = _content_hash(paths)
+        if cached is not None and cached[1] == content_hash:
+            _cache[paths] = (signature, content_hash, cached[2])
+            return cached[2]
+
+        with metrics.timer("lexicon_load"):
+            lexicon = read_lexicon(*paths)
+        logger.debug("Loaded lexicon version %s with %d keywords", lexicon.version, len(lexicon))
+        _cache[paths] = (signature, content_hash, lexicon)
+        return lexicon
@@ -0,0 +1,152 @@
+"""Lightweight per-stage timers and counters.
+
+Collection is off unless `enable()` is called or `TITLE_SCANNER_METRICS=1`
+is set. While off, `timer()` hands back one shared no-op context manager and
+`increment()` returns straight away, so instrumented code pays for little
+more than a function call.
+"""
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+PROMETHEUS_PREFIX = "title_scanner"
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class MetricsRegistry:
+    """Accumulates call counts and durations per timer and totals per counter."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                self._timers[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+
+    def increment(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self):
+        """Return {"timers": {name: stats}, "counters": {name: total}} sorted by name."""
+        with self._lock:
+            timers = {
+                name: {"count": count, "total_seconds": total, "max_seconds": longest}
+                for name, (count, total, longest) in sorted(self._timers.items())
+            }
+            counters = dict(sorted(self._counters.items()))
+        return {"timers": timers, "counters": counters}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        stage = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        lines = [f"# HELP {stage} Time spent per pipeline stage.", f"# TYPE {stage} summary"]
+        for name, stats in snapshot["timers"].items():
+            label = _label_value(name)
+            lines.append(f'{stage}_sum{{stage="{label}"}} {stats["total_seconds"]!r}')
+            lines.append(f'{stage}_count{{stage="{label}"}} {stats["count"]}')
+        longest = f"{PROMETHEUS_PREFIX}_stage_max_seconds"
+        lines += [f"# HELP {longest} Longest single call per pipeline stage.", f"# TYPE {longest} gauge"]
+        for name, stats in snapshot["timers"].items():
+            lines.append(f'{longest}{{stage="{_label_value(name)}"}} {stats["max_seconds"]!r}')
+        for name, total in snapshot["counters"].items():
+            metric = f"{PROMETHEUS_PREFIX}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {total}"]
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("_registry", "_name", "_start")
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._registry.observe(self._name, time.perf_counter() - self._start)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_value(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+REGISTRY = MetricsRegistry(enabled=os.getenv("TITLE_SCANNER_METRICS", "") not in ("", "0"))
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def enabled():
+    return REGISTRY.enabled
+
+
+def reset():
+    REGISTRY.reset()
+
+
+# The module-level helpers check the flag themselves to save a call when off
+def timer(name):
+    """Return a context manager that records the time spent in its block under `name`."""
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _Timer(REGISTRY, name)
+
+
+def increment(name, amount=1):
+    if REGISTRY.enabled:
+        REGISTRY.increment(name, amount)
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def to_json():
+    return REGISTRY.to_json()
+
+
+def to_prometheus():
+    return REGISTRY.to_prometheus()
@@ -0,0 +1,140 @@
+"""Daily YouTube Data API quota shared fairly between the channels of a run."""
+import datetime
+import threading
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from youtube_client import QuotaExceededError
+
+# The default quota of a Data API project
+DEFAULT_DAILY_UNITS = 10_000
+
+
+def _quota_timezone():
+    # Quotas reset at midnight Pacific time; fall back to UTC where the
+    # time zone database is not installed.
+    try:
+        return ZoneInfo("America/Los_Angeles")
+    except ZoneInfoNotFoundError:
+        return datetime.timezone.utc
+
+
+_QUOTA_TZ = _quota_timezone()
+
+
+def quota_day():
+    """Return the current quota day as an ISO date."""
+    return datetime.datetime.now(_QUOTA_TZ).date().isoformat()
+
+
+class QuotaScheduler:
+    """Spreads a daily quota of API units across the channels of a run.
+
+    Each channel gets an allowance when it starts: what is left of the day's
+    budget and not promised to a running channel, split evenly between it and
+    the channels still waiting. Units a channel does not use return to the
+    pool when its allowance is closed, so small channels leave more for the
+    large ones after them. Calls that belong to no channel, such as playlist
+    lookups, can be set aside up front with `reserve` or charged directly
+    with `spend`.
+
+    With a `TitleStore`, the units used are recorded per quota day, so every
+    run on the same day draws from one budget.
+    """
+
+    def __init__(self, daily_units=DEFAULT_DAILY_UNITS, store=None):
+        if daily_units < 0:
+            raise ValueError("daily_units must not be negative")
+        self.daily_units = daily_units
+        self.store = store
+        self._lock = threading.Lock()
+        self._day = quota_day()
+        self.used = store.quota_used(self._day) if store is not None else 0
+        self.reserved = 0
+
+    def _roll_over(self):
+        # Called with the lock held
+        day = quota_day()
+        if day != self._day:
+            self._day = day
+            self.used = self.store.quota_used(day) if self.store is not None else 0
+
+    def _available(self):
+        return max(self.daily_units - self.used - self.reserved, 0)
+
+    @property
+    def remaining(self):
+        """Units neither used today nor promised to a running channel."""
+        with self._lock:
+            self._roll_over()
+            return self._available()
+
+    def _charge(self, units):
+        # Called with the lock held
+        self.used += units
+        if self.store is not None:
+            self.store.add_quota_used(self._day, units)
+
+    def spend(self, units):
+        with self._lock:
+            self._roll_over()
+            if units > self._available():
+                raise QuotaExceededError(f"daily quota of {self.daily_units} units used up")
+            self._charge(units)
+
+    def _spend_reserved(self, units):
+        with self._lock:
+            self._roll_over()
+            self.reserved -= units
+            self._charge(units)
+
+    def reserve(self, units):
+        """Set aside up to `units` of the remaining units and return them as a `QuotaAllowance`."""
+        with self._lock:
+            self._roll_over()
+            units = min(units, self._available())
+            self.reserved += units
+        return QuotaAllowance(self, units)
+
+    def allocate(self, channels_left):
+        """Reserve a fair share of the remaining units for the next of `channels_left` channels."""
+        with self._lock:
+            self._roll_over()
+            units = self._available() // max(channels_left, 1)
+            self.reserved += units
+        return QuotaAllowance(self, units)
+
+    def _release(self, units):
+        with self._lock:
+            self.reserved -= units
+
+
+class QuotaAllowance:
+    """Units set aside by a `QuotaScheduler`; pass it to `YouTubeClient.with_quota`."""
+
+    def __init__(self, scheduler, units):
+        self.scheduler = scheduler
+        self.units = units
+        self.spent = 0
+
+    @property
+    def remaining(self):
+        return self.units - self.spent
+
+    def spend(self, units):
+        if units > self.remaining:
+            raise QuotaExceededError(f"channel allowance of {self.units} units used up")
+        self.spent += units
+        self.scheduler._spend_reserved(units)
+
+    def close(self):
+        """Hand the unused units back to the scheduler."""
+        unused = self.remaining
+        self.units = self.spent
+        if unused:
+            self.scheduler._release(unused)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,207 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+
+import metrics
+from scan_core import json_default
+
+REPORT_FORMATS = ("csv", "jsonl", "parquet", "xlsx")
+
+SHEET_NAME = "Scan Results"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class ReportWriter:
+    """Appends batches of result rows to a report file as they arrive.
+
+    Only the current batch is held in memory, so a report can grow to any
+    number of rows.
+    """
+
+    format = None
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, df):
+        if len(df):
+            with metrics.timer(f"export.{self.format}"):
+                self._write(df)
+            self.rows_written += len(df)
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        with metrics.timer(f"export.{self.format}"):
+            self.close()
+
+
+class CsvReportWriter(ReportWriter):
+    format = "csv"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._handle = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._handle)
+        self._header = None
+
+    def _write(self, df):
+        if self._header is None:
+            self._header = list(df.columns)
+            self._writer.writerow(self._header)
+        self._writer.writerows(df[self._header].itertuples(index=False, name=None))
+        self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+
+class JsonlReportWriter(ReportWriter):
+    format = "jsonl"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._handle = open(path, "w", encoding="utf-8")
+
+    def _write(self, df):
+        for row in df.to_dict(orient="records"):
+            self._handle.write(json.dumps(row, ensure_ascii=False, default=json_default))
+            self._handle.write("\n")
+        self._handle.flush()
+
+    def close(self):
+        self._handle.close()
+
+
+class ParquetReportWriter(ReportWriter):
+    """Writes each batch as its own row group; requires pyarrow."""
+
+    format = "parquet"
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow") from exc
+        self._pa = pa
+        self._pq = pq
+        self._writer = None
+
+    def _write(self, df):
+        if self._writer is None:
+            table = self._pa.Table.from_pandas(df, preserve_index=False)
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = self._pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class XlsxReportWriter(ReportWriter):
+    """Streams rows into an xlsxwriter workbook in constant-memory mode.
+
+    Each row is flushed to a temporary file as soon as the next one starts,
+    every cell shares one format, and the Safety Score colour scale is added
+    once the final row count is known.
+    """
+
+    format = "xlsx"
+    FONT_SIZE = 14
+    COLUMN_WIDTH = 25
+
+    def __init__(self, path):
+        super().__init__(path)
+        import xlsxwriter
+
+        self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+        self._sheet = self._workbook.add_worksheet(SHEET_NAME)
+        self._cell_format = self._workbook.add_format({"font_size": self.FONT_SIZE})
+        self._header = None
+
+    def _write(self, df):
+        sheet = self._sheet
+        cell_format = self._cell_format
+        if self._header is None:
+            self._header = list(df.columns)
+            sheet.set_column(0, len(self._header) - 1, self.COLUMN_WIDTH, cell_format)
+            sheet.write_row(0, 0, self._header, cell_format)
+        frame = df[self._header]
+        if frame.isna().to_numpy().any():
+            # Missing values become blank cells rather than NaN errors
+            frame = frame.astype(object).where(frame.notna(), None)
+        row = self.rows_written + 1
+        for values in frame.itertuples(index=False, name=None):
+            sheet.write_row(row, 0, values, cell_format)
+            row += 1
+
+    def close(self):
+        if self._header is not None and 'Safety Score' in self._header and self.rows_written:
+            col = self._header.index('Safety Score')
+            self._sheet.conditional_format(1, col, self.rows_written, col, {
+                'type': '2_color_scale', 'min_color': '#FF0000', 'max_color': '#00FF00',
+            })
+        self._workbook.close()
+
+
+_WRITERS = {
+    "csv": CsvReportWriter,
+    "jsonl": JsonlReportWriter,
+    "parquet": ParquetReportWriter,
+    "xlsx": XlsxReportWriter,
+}
+
+
+def report_format(path, fmt=None):
+    """Return the report format, inferred from the file extension if not given."""
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format {fmt!r}; choose one of {', '.join(REPORT_FORMATS)}")
+    return fmt
+
+
+def open_report_writer(path, fmt=None):
+    return _WRITERS[report_format(path, fmt)](path)
+
+
+def xlsx_bytes(df):
+    """Render a results DataFrame as an .xlsx file in memory."""
+    output = io.BytesIO()
+    with XlsxReportWriter(output) as writer:
+        writer.write(df)
+    return output.getvalue()
+
+
+def csv_bytes(df):
+    with metrics.timer("export.csv"):
+        return df.to_csv(index=False).encode("utf-8")
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def parquet_bytes(df):
+    """Render a results DataFrame as Parquet, or return None without pyarrow."""
+    if not parquet_available():
+        return None
+    output = io.BytesIO()
+    with metrics.timer("export.parquet"):
+        df.to_parquet(output, index=False)
+    return output.getvalue()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import metrics
+
+from scan_core import json_default, score_title, scoring_version
+
+RESULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "result_cache.sqlite3")
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    scoring_version TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+"""
+
+
+def normalize_title(title):
+    """Reduce a title to the form the scorer actually reads."""
+    return title.lower()
+
+
+def cache_key(title, version):
+    """Hash a normalized title together with the scoring version."""
+    return hashlib.blake2b(f"{version}\x1f{normalize_title(title)}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Memoizes `score_title` results per normalized title and scoring version.
+
+    Recently used rows are kept in an in-memory LRU of at most `max_entries`
+    rows. With a `path`, misses fall through to a SQLite table that survives
+    restarts. Entries scored with another lexicon or rule set are dropped as
+    soon as a different scoring version is seen, so editing either CSV
+    invalidates the cache without any manual step.
+    """
+
+    def __init__(self, max_entries=50_000, path=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "hit_rate": self.hit_rate}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM results")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+    def _use_version(self, version):
+        # Called with the lock held
+        if version == self._version:
+            return
+        self._entries.clear()
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute("DELETE FROM results WHERE scoring_version != ?", (version,))
+        self._version = version
+
+    def _remember(self, key, row):
+        self._entries[key] = row
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys):
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[start:start + _LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, result FROM results WHERE scoring_version = ? AND key IN ({placeholders})",
+                [self._version, *chunk],
+            ).fetchall()
+            found.update((key, json.loads(result)) for key, result in rows)
+        return found
+
+    def score_many(self, titles, lexicon):
+        """Return one result row per title, scoring only titles not seen before."""
+        titles = list(titles)
+        version = scoring_version(lexicon)
+        keys = [cache_key(title, version) for title in titles]
+        with self._lock:
+            self._use_version(version)
+            cached = {}
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    cached[key] = self._entries[key]
+            missing = list(dict.fromkeys(key for key in keys if key not in cached))
+            if missing and self._conn is not None:
+                stored = self._load(missing)
+                for key, row in stored.items():
+                    self._remember(key, row)
+                cached.update(stored)
+
+        rows = []
+        scored = {}
+        misses = 0
+        for title, key in zip(titles, keys):
+            row = cached.get(key) or scored.get(key)
+            if row is None:
+                misses += 1
+                row = scored[key] = score_title(title, lexicon)
+            # The cached row may come from a title with different casing
+            rows.append({**row, "Title": title})
+
+        metrics.increment("cache_hits", len(titles) - misses)
+        metrics.increment("cache_misses", misses)
+        with self._lock:
+            self.hits += len(titles) - misses
+            self.misses += misses
+            if scored and version == self._version:
+                for key, row in scored.items():
+                    self._remember(key, row)
+                if self._conn is not None:
+                    with self._conn:
+                        self._conn.executemany(
+                            "INSERT OR REPLACE INTO results (key, scoring_version, result) VALUES (?, ?, ?)",
+                            [(key, version, json.dumps(row, default=json_default)) for key, row in scored.items()],
+                        )
+        return rows
+
+    def score(self, title, lexicon):
+        return self.score_many([title], lexicon)[0]
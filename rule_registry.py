@@ -0,0 +1,85 @@
+import csv
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+import metrics
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_rules.csv")
+
+Rule = namedtuple("Rule", ["family", "label", "pattern", "severity"])
+
+
+class RuleFamily:
+    """A group of risky-phrase rules compiled into one alternation regex.
+
+    Every rule sits in a zero-width lookahead, so a single `finditer` pass
+    over a title tries each start position and reports every rule that
+    matches in it, including rules whose matches overlap or share a start.
+    """
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = list(rules)
+        # The named groups stop `re` from skipping ahead to characters a rule
+        # can start with, so texts are searched with the group-free `search`;
+        # at each match `regex` captures every rule that starts there in its
+        # own group.
+        search = "(?=(?:{}))".format("|".join(f"(?:{rule.pattern})" for rule in self.rules))
+        labels = "".join(f"(?:(?=(?P<r{idx}>{rule.pattern})))?" for idx, rule in enumerate(self.rules))
+        self.search = re.compile(search) if self.rules else None
+        self.regex = re.compile(search + labels) if self.rules else None
+        # Positions of the rule groups in `Match.groups()`; patterns may add groups of their own
+        self._groups = [self.regex.groupindex[f"r{idx}"] - 1 for idx in range(len(self.rules))] if self.rules else []
+        self._timer_name = f"rules.{name}"
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match_ids(self, text):
+        """Return the indices of the rules that match `text`, in registry order."""
+        if self.regex is None:
+            return []
+        groups = self._groups
+        matched = set()
+        with metrics.timer(self._timer_name):
+            for found in self.search.finditer(text):
+                values = self.regex.match(text, found.start()).groups()
+                matched.update(idx for idx, group in enumerate(groups) if values[group] is not None)
+        return sorted(matched)
+
+    def match(self, text):
+        """Return the rules that match `text`, in registry order."""
+        return [self.rules[idx] for idx in self.match_ids(text)]
+
+
+def load_rules(path=RULES_PATH):
+    """Read the rule CSV and compile one `RuleFamily` per family."""
+    grouped = {}
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        for row in csv.DictReader(handle):
+            severity = (row.get("severity") or "").strip()
+            rule = Rule(
+                family=row["family"].strip(),
+                label=row["label"].strip(),
+                pattern=row["pattern"],
+                severity=int(severity) if severity else 0,
+            )
+            grouped.setdefault(rule.family, []).append(rule)
+    return {family: RuleFamily(family, rules) for family, rules in grouped.items()}
+
+
+def _file_version(path):
+    with open(path, "rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()[:12]
+
+
+RULE_FAMILIES = load_rules()
+# Bump the suffix when the way rules match changes, so stored scores are redone
+RULES_VERSION = f"{_file_version(RULES_PATH)}-2"
+
+# Risky phrases add a context reason, a category and a severity deduction
+PHRASE_RULES = RULE_FAMILIES.get("phrase", RuleFamily("phrase", []))
+# Emotional tones only tag the title with a category
+TONE_RULES = RULE_FAMILIES.get("tone", RuleFamily("tone", []))
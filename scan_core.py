@@ -0,0 +1,298 @@
+"""Title scoring on the standard library alone.
+
+A `Scanner` compiles a lexicon and the rule families into integer-indexed
+tables once. Scanning a title yields a `ScanRecord` that keeps the title,
+the IDs of the matched lexicon entries, rules and categories, and the Safety
+Score; the comma-joined text columns are only built by `ScanRecord.row()`.
+Scanning many titles fills a `ScanResults`, which packs the same fields into
+arrays. pandas is imported by `to_dataframe` and nowhere else.
+"""
+import weakref
+from array import array
+
+import metrics
+from rule_registry import PHRASE_RULES, RULES_VERSION, TONE_RULES
+from text_normalizer import NORMALIZER_VERSION
+
+RESULT_COLUMNS = [
+    'Title', 'Flagged Words', 'Context Reason', 'Category', 'Safety Score',
+    'Less Harsh Keywords', 'Alternative Keywords', 'Opposite Keywords',
+]
+
+# Video fields scored on their own next to the title
+DETAIL_FIELDS = ("Description", "Tags")
+DETAIL_COLUMNS = [
+    f"{field} {column}" for field in DETAIL_FIELDS for column in ("Flagged Words", "Category", "Safety Score")
+]
+
+# Everything besides the lexicon that decides what a title matches
+MATCHING_VERSION = f"{RULES_VERSION}-n{NORMALIZER_VERSION}"
+
+_NO_IDS = ()
+
+
+def json_default(value):
+    """`json.dumps` fallback for the numpy scalars that rows and lexicons built from DataFrames carry."""
+    item = getattr(value, "item", None)
+    if item is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return item()
+
+
+def scoring_version(lexicon):
+    """Identify the lexicon, rule set and normalizer that produced a result row."""
+    return f"{lexicon.version}-{MATCHING_VERSION}"
+
+
+class ScanRecord:
+    """The outcome of scanning one title.
+
+    `entry_ids` index `scanner.lexicon.entries` in lexicon order, and
+    `phrase_ids` and `tone_ids` index the rules of the phrase and tone
+    families. `category_ids` index `scanner.categories` in the order the
+    categories were found. Titles without hits share one empty tuple.
+    """
+
+    __slots__ = ("scanner", "title", "entry_ids", "phrase_ids", "tone_ids", "category_ids", "score")
+
+    def __init__(self, scanner, title, entry_ids, phrase_ids, tone_ids, category_ids, score):
+        self.scanner = scanner
+        self.title = title
+        self.entry_ids = entry_ids
+        self.phrase_ids = phrase_ids
+        self.tone_ids = tone_ids
+        self.category_ids = category_ids
+        self.score = score
+
+    def __repr__(self):
+        return f"ScanRecord({self.title!r}, score={self.score})"
+
+    @property
+    def keywords(self):
+        entries = self.scanner.lexicon.entries
+        return [entries[idx].keyword for idx in self.entry_ids]
+
+    @property
+    def categories(self):
+        categories = self.scanner.categories
+        return [categories[idx] for idx in self.category_ids]
+
+    def spans(self):
+        """Return (keyword, start, end) for every keyword occurrence in the title, disguised ones included."""
+        return self.scanner.lexicon.matcher.find_spans(self.title)
+
+    def row(self):
+        """Return the result row dict `score_title` has always produced.
+
+        The context reason of a keyword found only in disguise quotes how
+        the lowercased title wrote it.
+        """
+        scanner = self.scanner
+        hits = [scanner.lexicon.entries[idx] for idx in self.entry_ids]
+        disguises = scanner.lexicon.matcher.find_disguised(self.title.lower()) if hits else {}
+        context_reason = [
+            f'{entry.keyword} (written "{disguises[entry.keyword]}"): {entry.context}'
+            if entry.keyword in disguises else f"{entry.keyword}: {entry.context}"
+            for entry in hits if entry.context is not None
+        ]
+        context_reason.extend(f"Phrase flagged: {scanner.phrase_rules.rules[idx].label}" for idx in self.phrase_ids)
+        return {
+            'Title': self.title,
+            'Flagged Words': ", ".join(entry.keyword for entry in hits) if hits else "None",
+            'Context Reason': ", ".join(context_reason) if context_reason else "-",
+            'Category': ", ".join(self.categories) if self.category_ids else "-",
+            'Safety Score': self.score,
+            'Less Harsh Keywords': ", ".join(entry.less_harsh for entry in hits) if hits else "-",
+            'Alternative Keywords': ", ".join(entry.alternative for entry in hits) if hits else "-",
+            'Opposite Keywords': ", ".join(entry.opposite for entry in hits) if hits else "-"
+        }
+
+
+class _IdColumn:
+    # Variable-length rows of IDs packed as offsets into one flat array
+    __slots__ = ("offsets", "values")
+
+    def __init__(self):
+        self.offsets = array("I", [0])
+        self.values = array("I")
+
+    def append(self, ids):
+        if ids:
+            self.values.extend(ids)
+        self.offsets.append(len(self.values))
+
+    def __getitem__(self, idx):
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return tuple(self.values[start:end]) if end > start else _NO_IDS
+
+
+class ScanResults:
+    """The records of a scan stored column-wise.
+
+    Titles are kept by reference, Safety Scores as bytes and each kind of ID
+    in one flat array, so a title without hits costs a few dozen bytes.
+    Fractional severities give float scores, which no byte array can hold;
+    from the first of them on, scores are kept in a list exactly as scored.
+    Indexing and iteration hand out `ScanRecord`s built on the fly.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.titles = []
+        self.scores = array("B")
+        self._entries = _IdColumn()
+        self._phrases = _IdColumn()
+        self._tones = _IdColumn()
+        self._categories = _IdColumn()
+
+    def append(self, record):
+        self.titles.append(record.title)
+        try:
+            self.scores.append(record.score)
+        except TypeError:
+            self.scores = list(self.scores)
+            self.scores.append(record.score)
+        self._entries.append(record.entry_ids)
+        self._phrases.append(record.phrase_ids)
+        self._tones.append(record.tone_ids)
+        self._categories.append(record.category_ids)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self.titles)
+        return ScanRecord(
+            self.scanner, self.titles[idx], self._entries[idx], self._phrases[idx], self._tones[idx],
+            self._categories[idx], self.scores[idx],
+        )
+
+    def __iter__(self):
+        for idx in range(len(self.titles)):
+            yield self[idx]
+
+    def rows(self):
+        """Return the result row dict of every record."""
+        return [record.row() for record in self]
+
+
+class Scanner:
+    """A lexicon and rule set compiled for scanning; see `scanner_for`."""
+
+    def __init__(self, lexicon, phrase_rules=PHRASE_RULES, tone_rules=TONE_RULES):
+        self.lexicon = lexicon
+        self.phrase_rules = phrase_rules
+        self.tone_rules = tone_rules
+        self.version = scoring_version(lexicon)
+        # Every category a record can carry, each name once
+        self.categories = []
+        category_ids = {}
+
+        def category_id(name):
+            if name not in category_ids:
+                category_ids[name] = len(self.categories)
+                self.categories.append(name)
+            return category_ids[name]
+
+        self._entry_categories = [
+            None if entry.category is None else category_id(entry.category) for entry in lexicon.entries
+        ]
+        self._entry_severities = [0 if entry.severity is None else entry.severity for entry in lexicon.entries]
+        self._phrase_categories = [category_id(rule.label) for rule in phrase_rules.rules]
+        self._tone_categories = [category_id(f"Emotional Tone: {rule.label}") for rule in tone_rules.rules]
+        self._phrase_severities = [rule.severity for rule in phrase_rules.rules]
+
+    def scan_title(self, title):
+        lower_title = title.lower()
+        with metrics.timer("match.keywords"):
+            entry_ids = self.lexicon.matcher.match(lower_title)
+        metrics.increment("titles_scanned")
+        metrics.increment("keyword_hits", len(entry_ids))
+        phrase_ids = self.phrase_rules.match_ids(lower_title)
+        tone_ids = self.tone_rules.match_ids(lower_title)
+        if not (entry_ids or phrase_ids or tone_ids):
+            return ScanRecord(self, title, _NO_IDS, _NO_IDS, _NO_IDS, _NO_IDS, 100)
+
+        entry_categories = self._entry_categories
+        # A dict keeps categories unique while preserving the order they were found in
+        categories = dict.fromkeys(
+            entry_categories[idx] for idx in entry_ids if entry_categories[idx] is not None
+        )
+        categories.update(dict.fromkeys(self._phrase_categories[idx] for idx in phrase_ids))
+        categories.update(dict.fromkeys(self._tone_categories[idx] for idx in tone_ids))
+        severities = self._entry_severities
+        phrase_severities = self._phrase_severities
+        total_severity = (
+            sum(severities[idx] for idx in entry_ids) + sum(phrase_severities[idx] for idx in phrase_ids)
+        )
+        return ScanRecord(
+            self, title, tuple(entry_ids) or _NO_IDS, tuple(phrase_ids) or _NO_IDS, tuple(tone_ids) or _NO_IDS,
+            tuple(categories) or _NO_IDS, max(0, min(100, 100 - total_severity)),
+        )
+
+    def scan(self, titles):
+        """Scan every title in `titles` into a `ScanResults`, in order."""
+        results = ScanResults(self)
+        scan_title = self.scan_title
+        for title in titles:
+            results.append(scan_title(title))
+        return results
+
+
+# Compiled scanners live as long as their lexicon
+_SCANNERS = weakref.WeakKeyDictionary()
+
+
+def scanner_for(lexicon):
+    """Return the `Scanner` compiled for `lexicon`, compiling it on first use."""
+    scanner = _SCANNERS.get(lexicon)
+    if scanner is None:
+        scanner = _SCANNERS[lexicon] = Scanner(lexicon)
+    return scanner
+
+
+def scan_titles(titles, lexicon):
+    """Scan an iterable of titles into a `ScanResults`."""
+    return scanner_for(lexicon).scan(titles)
+
+
+def score_title(title, lexicon):
+    """Score a single title against a compiled `Lexicon` and return its result row."""
+    return scanner_for(lexicon).scan_title(title).row()
+
+
+def score_titles(titles, lexicon, cache=None):
+    """Score several titles, going through a `ResultCache` when one is given."""
+    if cache is None:
+        return scan_titles(titles, lexicon).rows()
+    return cache.score_many(titles, lexicon)
+
+
+def score_details(description, tags, lexicon):
+    """Score a video's description and tags separately and return their `DETAIL_COLUMNS`.
+
+    Tags are scored as one text with a line per tag, so a multi-word keyword
+    only matches within a single tag.
+    """
+    scanner = scanner_for(lexicon)
+    row = {}
+    for field, text in zip(DETAIL_FIELDS, (description, "\n".join(tags))):
+        record = scanner.scan_title(text)
+        keywords = record.keywords
+        row[f"{field} Flagged Words"] = ", ".join(keywords) if keywords else "None"
+        row[f"{field} Category"] = ", ".join(record.categories) if record.category_ids else "-"
+        row[f"{field} Safety Score"] = record.score
+    return row
+
+
+def known_categories(lexicon):
+    """Return every category a result row scored with `lexicon` can carry."""
+    return list(scanner_for(lexicon).categories)
+
+
+def to_dataframe(records):
+    """Return the result rows of `ScanRecord`s or a `ScanResults` as a DataFrame with `RESULT_COLUMNS`."""
+    import pandas as pd
+
+    return pd.DataFrame([record.row() for record in records], columns=RESULT_COLUMNS)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from lexicon import Lexicon, load_lexicon
+from scan_titles_weighted_contextual_v3_riskaware import (
+    scan_titles_batch, scan_titles_parallel, scan_titles_weighted, score_title,
+)
+
+TITLES = [
+    "A calm walk in the park", "KILL the lights", "kill the lights", "Get rich quick with this crazy trick",
+    "Miracle cure cancer revealed", "what the f*ck", "sh1t happens", "S H I T storm", "Top 10 moments of 2024",
+    "9/11 documentary", "", "I hate my life, I feel alone", "s**t happens", "the b**t drops",
+]
+
+
+def _rows(batch):
+    return [
+        {column: int(value) if column == "Safety Score" else value for column, value in row.items()}
+        for row in batch.results.to_dict("records")
+    ]
+
+
+def test_batch_rows_match_the_serial_scanner():
+    lexicon = load_lexicon()
+    batch = scan_titles_batch(pd.Series(TITLES), lexicon=lexicon)
+    assert _rows(batch) == [score_title(title, lexicon) for title in TITLES]
+
+
+def test_hit_matrix_marks_every_title_with_the_keyword():
+    lexicon = load_lexicon()
+    batch = scan_titles_batch(pd.Series(TITLES), lexicon=lexicon)
+    assert batch.hits["kill"].to_numpy().tolist() == [False, True, True] + [False] * (len(TITLES) - 3)
+    for idx, title in enumerate(TITLES):
+        flagged = {column for column in batch.hits.columns if batch.hits[column].iloc[idx]}
+        expected = score_title(title, lexicon)["Flagged Words"]
+        assert flagged == (set() if expected == "None" else set(expected.split(", ")))
+
+
+def test_titles_with_digits_and_disguises_match_the_serial_scanner():
+    keywords = ["kill", "shit", "ak47", "covid19", "9/11", "top 10 fails", "area 51"]
+    df_keywords = pd.DataFrame({"keyword": keywords, "context": "Flagged", "category": "Test"})
+    df_severity = pd.DataFrame({"keyword": keywords, "severity": [30, 25, 20, 15, 10, 5, 5]})
+    lexicon = Lexicon.from_frames(df_keywords, df_severity)
+    titles = [
+        "Top 10 Fails of 2024", "ak47 review", "AK-47 review", "covid19 update", "c0vid19 update", "9/11 and area 51",
+        "k1ll count: 5", "Part 3 - sh1t happens", "s**t and kill", "S H I T 2023", "Top 10 moments", "k i l l 4k",
+    ]
+    batch = scan_titles_batch(titles, lexicon=lexicon)
+    assert _rows(batch) == [score_title(title, lexicon) for title in titles]
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in batch.hits.dtypes)
+
+
+def test_nan_severity_counts_as_none_in_both_paths():
+    df_keywords = pd.DataFrame({"keyword": ["kill", "hate"], "context": ["Violence", "Hate"]})
+    df_severity = pd.DataFrame({"keyword": ["kill", "hate"], "severity": [np.nan, 10]})
+    lexicon = Lexicon.from_frames(df_keywords, df_severity)
+    assert lexicon.entries[0].severity is None
+    titles = ["kill it", "hate it"]
+    assert _rows(scan_titles_batch(titles, lexicon=lexicon)) == [score_title(title, lexicon) for title in titles]
+
+
+def test_parallel_scan_matches_the_serial_scan():
+    lexicon = load_lexicon()
+    titles = [f"{title} #{idx}" for idx in range(5) for title in TITLES]
+    parallel = scan_titles_parallel(titles, lexicon=lexicon, workers=2, chunk_size=4)
+    pd.testing.assert_frame_equal(parallel, scan_titles_weighted(titles, lexicon=lexicon))
+    assert parallel["Title"].tolist() == titles
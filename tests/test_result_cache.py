@@ -0,0 +1,66 @@
+import sqlite3
+
+from lexicon import Lexicon
+from result_cache import ResultCache
+from scan_core import score_title, scoring_version
+
+
+def _lexicon(**severities):
+    keyword_rows = [{"keyword": keyword, "context": "Flagged", "category": "Test"} for keyword in severities]
+    return Lexicon.from_records(keyword_rows, severities.items())
+
+
+LEXICON = _lexicon(kill=30, hate=20)
+
+
+def test_hits_and_misses_are_counted():
+    cache = ResultCache()
+    rows = cache.score_many(["Kill it", "kill it", "A calm walk"], LEXICON)
+    # Titles that only differ in case share one entry, even within a batch
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+    assert rows == [score_title(title, LEXICON) for title in ["Kill it", "kill it", "A calm walk"]]
+    assert cache.score("KILL IT", LEXICON) == score_title("KILL IT", LEXICON)
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2, "hit_rate": 0.5}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.score_many(["a", "b"], LEXICON)
+    cache.score("a", LEXICON)
+    cache.score("c", LEXICON)
+    assert len(cache) == 2
+    cache.score_many(["a", "c"], LEXICON)
+    assert cache.misses == 3
+    cache.score("b", LEXICON)
+    assert cache.misses == 4
+
+
+def test_the_sqlite_tier_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path=path)
+    cache.score_many(["Kill it", "I hate it"], LEXICON)
+    cache.close()
+
+    reopened = ResultCache(path=path)
+    assert reopened.score_many(["kill it", "I hate it"], LEXICON) == [
+        score_title("kill it", LEXICON), score_title("I hate it", LEXICON),
+    ]
+    assert (reopened.hits, reopened.misses) == (2, 0)
+
+
+def test_a_lexicon_change_is_not_served_stale_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path=path)
+    cache.score("Kill it", LEXICON)
+    cache.close()
+
+    changed = _lexicon(kill=45, hate=20)
+    assert scoring_version(changed) != scoring_version(LEXICON)
+    reopened = ResultCache(path=path)
+    assert reopened.score("Kill it", changed)["Safety Score"] == score_title("Kill it", changed)["Safety Score"] == 55
+    assert (reopened.hits, reopened.misses) == (0, 1)
+    reopened.close()
+    conn = sqlite3.connect(path)
+    versions = conn.execute("SELECT DISTINCT scoring_version FROM results").fetchall()
+    conn.close()
+    assert versions == [(scoring_version(changed),)]
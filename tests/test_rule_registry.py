@@ -0,0 +1,30 @@
+import re
+
+from lexicon import load_lexicon
+from rule_registry import PHRASE_RULES, Rule, RuleFamily
+from scan_core import score_title
+
+
+def test_overlapping_phrases_are_each_deducted():
+    # "cure cancer" starts inside "miracle cure"; both Health Misinformation rules apply
+    patterns = [PHRASE_RULES.rules[idx].pattern for idx in PHRASE_RULES.match_ids("miracle cure cancer")]
+    assert patterns == ["cure cancer", "miracle cure"]
+    assert score_title("Miracle cure cancer revealed", load_lexicon())["Safety Score"] == 40
+    assert score_title("earn $100% success", load_lexicon())["Safety Score"] == 55
+
+
+def test_rules_sharing_a_start_are_all_reported():
+    family = RuleFamily("test", [
+        Rule("test", "a", "get rich", 1), Rule("test", "b", "get rich quick", 1), Rule("test", "c", "rich", 1),
+    ])
+    assert family.match_ids("how to get rich quick") == [0, 1, 2]
+
+
+def test_matches_agree_with_one_search_per_rule():
+    texts = [
+        "you won't believe this insane crazy video", "get rich quick: earn $500 act now", "gone wrong",
+        "100% success guaranteed results never fail", "nothing to see", "",
+    ]
+    for text in texts:
+        expected = [idx for idx, rule in enumerate(PHRASE_RULES.rules) if re.search(rule.pattern, text)]
+        assert PHRASE_RULES.match_ids(text) == expected
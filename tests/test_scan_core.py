@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import pytest
+
+from lexicon import Lexicon
+from scan_core import json_default, scan_titles, score_title, score_titles
+
+TITLES = ["A calm walk", "Kill the lights", "I hate it, kill it"]
+
+
+def _lexicon(kill_severity):
+    keyword_rows = [
+        {"keyword": "kill", "context": "Violence", "category": "Violence"},
+        {"keyword": "hate", "context": "Hate", "category": "Hate"},
+    ]
+    return Lexicon.from_records(keyword_rows, [("kill", kill_severity), ("hate", 10)])
+
+
+def test_fractional_severity_scores_match_score_title():
+    lexicon = _lexicon(12.5)
+    results = scan_titles(TITLES, lexicon)
+    assert [record.score for record in results] == [100, 87.5, 77.5]
+    assert results.rows() == [score_title(title, lexicon) for title in TITLES]
+    assert score_titles(TITLES, lexicon) == results.rows()
+
+
+def test_integer_scores_stay_packed():
+    results = scan_titles(TITLES, _lexicon(20))
+    assert [record.score for record in results] == [100, 80, 70]
+    assert results.scores.typecode == "B"
+
+
+def test_json_default_unwraps_numpy_scalars_only():
+    row = {"Safety Score": np.int64(70), "Severity": np.float64(12.5)}
+    assert json.loads(json.dumps(row, default=json_default)) == {"Safety Score": 70, "Severity": 12.5}
+    with pytest.raises(TypeError):
+        json.dumps({"Title": object()}, default=json_default)
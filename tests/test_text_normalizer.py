@@ -0,0 +1,53 @@
+from keyword_matcher import KeywordMatcher
+from lexicon import load_lexicon
+from scan_core import score_title
+from text_normalizer import normalize
+
+
+def test_disguises_are_undone():
+    assert normalize("sh1t").text == "shit"
+    assert normalize("a$$hole").text == "asshole"
+    assert normalize("ѕhіt").text == "shit"  # Cyrillic s and i
+    assert normalize("ｆｕｃｋ").text == "fuck"
+    assert normalize("café").text == "cafe"
+    assert normalize("f u c k this").text == "fuck this"
+    assert normalize("s.h.1.t").text == "shit"
+
+
+def test_numbers_and_plain_text_are_left_alone():
+    assert normalize("2024") is None
+    assert normalize("9/11") is None
+    assert normalize("wow!") is None
+    assert normalize("Top 10 moments of 2024").text == "top 10 moments of 2024"
+
+
+def test_masked_letters_stay_wildcards():
+    assert normalize("f*ck").text == "f*ck"
+    assert normalize("s**t happens").text == "s**t happens"
+
+
+def test_positions_point_into_the_original():
+    normalized = normalize("f u c k this")
+    assert [normalized.positions[idx] for idx in range(4)] == [0, 2, 4, 6]
+    assert normalize("ｆｕｃｋ").positions == [0, 1, 2, 3]
+
+
+def test_spans_cover_the_written_form():
+    matcher = KeywordMatcher(["shit", "fuck", "asshole"])
+    assert matcher.find_spans("What the F.U.C.K") == [("fuck", 9, 16)]
+    assert matcher.find_spans("ѕhіt happens") == [("shit", 0, 4)]
+    assert matcher.find_spans("you're an a$$hole") == [("asshole", 10, 17)]
+    assert matcher.find_spans("SHIT and sh1t") == [("shit", 0, 4), ("shit", 9, 13)]
+    assert matcher.find_disguised("what the f*ck") == {"fuck": "f*ck"}
+    assert matcher.find_disguised("shit and sh1t") == {}
+
+
+def test_a_masked_word_is_one_keyword():
+    matcher = KeywordMatcher(["shit", "slut", "beat", "fuck"])
+    assert matcher.find_keywords("s**t happens") == {"shit"}
+    assert matcher.find_spans("s**t happens") == [("shit", 0, 4)]
+    assert matcher.find_keywords("the b**t") == {"beat"}
+    # Each masked word settles on its own keyword; unmasked ones still count
+    assert matcher.find_keywords("s**t and slut") == {"shit", "slut"}
+    assert matcher.find_keywords("f**k s**t") == {"fuck", "shit"}
+    assert score_title("s**t happens", load_lexicon())["Flagged Words"] == "shit"
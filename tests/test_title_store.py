@@ -0,0 +1,172 @@
+import pytest
+
+from lexicon import Lexicon
+from scan_core import score_title, scoring_version
+from title_store import (
+    MAX_SEARCH_ROWS, ChannelNotFoundError, RescoreResult, TitleStore, iter_channel_scan, iter_sync_pages,
+    rescore_store, score_channel, sync_channel,
+)
+from youtube_client import YouTubeAPIError
+
+
+class FakeClient:
+    """Serves one uploads playlist and counts the playlist lookups.
+
+    With `fail_after`, the request for the page after that many pages fails.
+    """
+
+    def __init__(self, videos, page_size=2, fail_after=None):
+        self.videos = videos
+        self.page_size = page_size
+        self.fail_after = fail_after
+        self.lookups = 0
+
+    def get_uploads_playlist_id(self, channel_id):
+        self.lookups += 1
+        return "UU" + channel_id[2:]
+
+    def iter_playlist_pages(self, uploads_playlist_id, raise_errors=False, next_tokens=False):
+        for page, start in enumerate(range(0, len(self.videos), self.page_size)):
+            if page == self.fail_after:
+                raise YouTubeAPIError({"code": 500, "message": "Backend error"})
+            items = [
+                {"snippet": {"title": title, "resourceId": {"videoId": video_id}}}
+                for video_id, title in self.videos[start:start + self.page_size]
+            ]
+            next_token = str(start + self.page_size) if start + self.page_size < len(self.videos) else ""
+            yield (items, next_token) if next_tokens else items
+
+
+TITLES = [
+    "A calm walk", "Kill the lights", "I hate it, kill it", "Hate hate HATE", "sh1t happens", "s**t happens",
+    "the b**t drops", "Miracle cure cancer revealed", "kill hate shit slut beat", "K I L L them all",
+]
+
+SEVERITIES = {"kill": 30, "hate": 20, "shit": 25, "slut": 20, "beat": 5}
+
+
+def _lexicon(keywords, **severities):
+    keyword_rows = [{"keyword": keyword, "context": "Flagged", "category": "Test"} for keyword in keywords]
+    return Lexicon.from_records(keyword_rows, {**SEVERITIES, **severities}.items())
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TitleStore(str(tmp_path / "titles.sqlite3"))
+
+
+def test_sync_uses_a_resolved_uploads_playlist(store):
+    client = FakeClient([("v3", "Third"), ("v2", "Second"), ("v1", "First")])
+    result = sync_channel(client, store, "UC1", uploads_playlist_id="UU1")
+    assert client.lookups == 0
+    assert result.new == 3
+    assert sync_channel(client, store, "UC1").new == 0
+    assert client.lookups == 1
+
+
+def test_a_limit_reached_on_the_last_page_still_completes_the_sync(store):
+    client = FakeClient([("v3", "Third"), ("v2", "Second"), ("v1", "First")])
+    result = sync_channel(client, store, "UC1", max_results=3)
+    assert (result.new, result.pages, result.saved) == (3, 2, True)
+    assert store.is_complete("UC1")
+
+
+def test_a_sync_cut_short_before_the_stored_uploads_keeps_nothing(store):
+    sync_channel(FakeClient([("v2", "Second"), ("v1", "First")]), store, "UC1")
+    lexicon = _lexicon(["kill", "hate"])
+    client = FakeClient([("v5", "Kill it"), ("v4", "Hate it"), ("v3", "Third"), ("v2", "Second")], fail_after=1)
+    result = sync_channel(client, store, "UC1")
+    assert (result.new, result.pages, result.saved) == (0, 1, False)
+
+    rows = [row for batch in iter_channel_scan(client, store, "UC1", lexicon) for row in batch]
+    # The fetched titles are still scored and yielded, then the stored ones
+    assert [row["Title"] for row in rows] == ["Kill it", "Hate it", "Second", "First"]
+    assert store.known_titles("UC1") == {"v2": "Second", "v1": "First"}
+    assert store.search(keyword="kill") == []
+    assert list(store.results_with_tokens(scoring_version(lexicon), {"kill"})) == []
+
+
+def test_sync_of_an_unknown_channel(store):
+    client = FakeClient([])
+    client.get_uploads_playlist_id = lambda channel_id: None
+    assert sync_channel(client, store, "UC1") is None
+    with pytest.raises(ChannelNotFoundError):
+        next(iter_sync_pages(client, store, "UC1"))
+
+
+@pytest.mark.parametrize("new_lexicon, expected", [
+    # Masked titles are re-scored whenever a keyword is added or removed
+    (_lexicon(["kill", "hate", "shit", "slut", "beat", "cure"]), RescoreResult(rescored=3, adjusted=0, retagged=7)),
+    (_lexicon(["kill", "shit", "slut"]), RescoreResult(rescored=5, adjusted=0, retagged=5)),
+    # "s**t" stays "shit" though only "slut" changed; a score clamped at 0 is re-scored
+    (
+        _lexicon(["kill", "hate", "shit", "slut", "beat"], kill=45, slut=60),
+        RescoreResult(rescored=1, adjusted=3, retagged=6),
+    ),
+], ids=["added", "removed", "severity"])
+def test_rescore_matches_a_fresh_scan(store, new_lexicon, expected):
+    client = FakeClient([(f"v{idx}", title) for idx, title in enumerate(TITLES)])
+    sync_channel(client, store, "UC1")
+    old_lexicon = _lexicon(["kill", "hate", "shit", "slut", "beat"])
+    score_channel(store, "UC1", old_lexicon)
+
+    assert rescore_store(store, new_lexicon) == expected
+    rows = store.results("UC1")
+    assert len(rows) == len(TITLES)
+    for row in rows:
+        assert row == score_title(row["Title"], new_lexicon)
+
+
+@pytest.fixture
+def scored_store(store):
+    lexicon = _lexicon(["kill", "hate", "shit", "slut", "beat"])
+    sync_channel(FakeClient([(f"v{idx}", title) for idx, title in enumerate(TITLES)]), store, "UC1")
+    score_channel(store, "UC1", lexicon)
+    sync_channel(FakeClient([("w1", "Kill them"), ("w2", "Nice day")]), store, "UC2")
+    score_channel(store, "UC2", lexicon)
+    return store
+
+
+def _found(rows):
+    return [(row["Channel ID"], row["Video ID"], row["Safety Score"]) for row in rows]
+
+
+def test_search_by_keyword(scored_store):
+    rows = scored_store.search(keyword="Kill")
+    assert sorted(_found(rows)) == [("UC1", "v1", 70), ("UC1", "v2", 50), ("UC1", "v8", 0), ("UC1", "v9", 70),
+                                    ("UC2", "w1", 70)]
+    assert [row["Safety Score"] for row in rows] == [0, 50, 70, 70, 70]
+    lexicon = _lexicon(["kill", "hate", "shit", "slut", "beat"])
+    for row in rows:
+        assert {key: value for key, value in row.items() if key not in ("Channel ID", "Video ID")} == score_title(
+            row["Title"], lexicon
+        )
+    assert _found(scored_store.search(keyword="kill", channel_id="UC2")) == [("UC2", "w1", 70)]
+    assert scored_store.search(keyword="cure") == []
+
+
+def test_search_by_category(scored_store):
+    assert _found(scored_store.search(category="Health Misinformation")) == [("UC1", "v7", 40)]
+    assert _found(scored_store.search(category="Emotional Tone: Anger")) == [
+        ("UC1", "v8", 0), ("UC1", "v2", 50), ("UC1", "v3", 80),
+    ]
+    assert _found(scored_store.search(keyword="kill", category="Emotional Tone: Anger")) == [
+        ("UC1", "v8", 0), ("UC1", "v2", 50),
+    ]
+
+
+def test_search_by_score_range(scored_store):
+    rows = scored_store.search(min_score=60, max_score=80)
+    assert sorted(_found(rows)) == [("UC1", "v1", 70), ("UC1", "v3", 80), ("UC1", "v4", 75), ("UC1", "v5", 75),
+                                    ("UC1", "v9", 70), ("UC2", "w1", 70)]
+    assert [row["Safety Score"] for row in rows] == [70, 70, 70, 75, 75, 80]
+    assert _found(scored_store.search(keyword="hate", min_score=60)) == [("UC1", "v3", 80)]
+
+
+def test_search_orders_by_safety_score_and_stops_at_the_limit(scored_store):
+    rows = scored_store.search()
+    assert len(rows) == len(TITLES) + 2
+    assert [row["Safety Score"] for row in rows] == sorted(row["Safety Score"] for row in rows)
+    assert _found(scored_store.search(limit=3)) == [("UC1", "v8", 0), ("UC1", "v7", 40), ("UC1", "v2", 50)]
+    assert scored_store.search(limit=0) == []
+    assert len(scored_store.search(channel_id="UC2", limit=MAX_SEARCH_ROWS + 1)) == 2
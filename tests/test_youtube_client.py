@@ -0,0 +1,109 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from youtube_client import MAX_IDS_PER_CALL, PAGE_SIZE, QuotaExceededError, YouTubeClient
+
+
+class FakeYouTube:
+    """A stand-in for the Data API on 127.0.0.1 that records every request.
+
+    `responses` queues (status, payload) answers that are served, in order,
+    before any regular one.
+    """
+
+    def __init__(self, videos=()):
+        self.videos = list(videos)
+        self.requests = []
+        self.responses = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+                fake.requests.append((url.path.rsplit("/", 1)[-1], params))
+                status, payload = fake.responses.pop(0) if fake.responses else fake.answer(url.path, params)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, path, params):
+        if path.endswith("/channels"):
+            items = [
+                {"id": channel_id, "contentDetails": {"relatedPlaylists": {"uploads": "UU" + channel_id[2:]}}}
+                for channel_id in params["id"].split(",")
+            ]
+            return 200, {"items": items}
+        start = int(params.get("pageToken") or 0)
+        size = int(params["maxResults"])
+        page = {"items": [
+            {"snippet": {"title": title, "resourceId": {"videoId": video_id}}}
+            for video_id, title in self.videos[start:start + size]
+        ]}
+        if start + size < len(self.videos):
+            page["nextPageToken"] = str(start + size)
+        return 200, page
+
+    def calls(self, endpoint):
+        return [params for name, params in self.requests if name == endpoint]
+
+
+@pytest.fixture
+def fake():
+    fake = FakeYouTube([(f"v{idx}", f"Video {idx}") for idx in range(120)])
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def test_channels_are_looked_up_fifty_at_a_time(fake):
+    channel_ids = [f"UC{idx}" for idx in range(120)]
+    playlists = YouTubeClient("key", base_url=fake.url).get_uploads_playlist_ids(channel_ids + channel_ids[:5])
+    assert playlists == {channel_id: "UU" + channel_id[2:] for channel_id in channel_ids}
+    batches = [params["id"].split(",") for params in fake.calls("channels")]
+    assert [len(batch) for batch in batches] == [MAX_IDS_PER_CALL, MAX_IDS_PER_CALL, 20]
+    assert sum(batches, []) == channel_ids
+
+
+def test_playlist_pages_follow_next_page_token(fake):
+    videos = YouTubeClient("key", base_url=fake.url).fetch_videos("UU1")
+    assert videos == fake.videos
+    assert [params["pageToken"] for params in fake.calls("playlistItems")] == ["", str(PAGE_SIZE), str(2 * PAGE_SIZE)]
+    assert all(params["key"] == "key" for params in fake.calls("playlistItems"))
+    pages = list(YouTubeClient("key", base_url=fake.url).iter_playlist_pages("UU1", next_tokens=True))
+    assert [token for _, token in pages] == [str(PAGE_SIZE), str(2 * PAGE_SIZE), ""]
+
+
+def test_rate_limited_calls_are_retried(fake):
+    fake.responses.append((429, {"error": {"code": 429, "message": "Too many requests"}}))
+    assert YouTubeClient("key", base_url=fake.url).get_uploads_playlist_ids(["UC1"]) == {"UC1": "UU1"}
+    assert len(fake.calls("channels")) == 2
+
+
+def test_quota_exceeded_responses_raise(fake):
+    error = {"error": {"code": 403, "message": "Quota exceeded", "errors": [{"reason": "quotaExceeded"}]}}
+    client = YouTubeClient("key", base_url=fake.url)
+    fake.responses.append((403, error))
+    with pytest.raises(QuotaExceededError):
+        client.get_uploads_playlist_ids(["UC1"])
+    fake.responses.append((403, error))
+    with pytest.raises(QuotaExceededError):
+        next(client.iter_playlist_pages("UU1", raise_errors=True))
+    # A 403 is not retried
+    assert len(fake.requests) == 2
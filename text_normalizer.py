@@ -0,0 +1,129 @@
+"""Undo the usual ways of disguising a word before keyword matching.
+
+`normalize` folds case, accents, compatibility forms (fullwidth, math
+alphanumerics and the like) and lookalike letters from other scripts,
+drops invisible format characters, joins letters spelled out with
+separators ("f.u.c.k") and reads digits and symbols inside a word as the
+letters they stand for ("sh1t", "a$$hole"). A `*` left inside a word is a
+masked letter; `KeywordMatcher` treats it as a wildcard. Every output
+character remembers the input character it came from, so a match in the
+normalized text maps back to a span of the original.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+# Part of the scoring version; bump it whenever the output of `normalize`, or
+# the way `KeywordMatcher` matches it, changes
+NORMALIZER_VERSION = "2"
+
+WILDCARD = "*"
+
+# Digits and symbols read as letters when they appear inside a word
+LEET = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "l", "+": "t", "€": "e", "£": "l",
+}
+
+# Letters that look like Latin ones but that NFKD leaves alone
+LOOKALIKES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "і": "i", "ј": "j", "к": "k", "о": "o", "р": "p", "с": "c",
+    "у": "y", "х": "x", "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w", "һ": "h", "ӏ": "l", "ү": "y",
+    # Greek
+    "α": "a", "β": "b", "γ": "y", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin letters without a decomposition
+    "ı": "i", "ł": "l", "ø": "o", "đ": "d", "ħ": "h", "ß": "ss", "æ": "ae", "œ": "oe",
+}
+
+Normalized = namedtuple("Normalized", ["text", "positions"])
+
+_LEET_TABLE = str.maketrans(LEET)
+_DISGUISED = re.compile(r"[0-9$@!|+€£*]")
+# Words never span whitespace, and only those with one of `_DISGUISED` change
+_DISGUISED_CHUNK = re.compile(r"\S*[0-9$@!|+€£*]\S*")
+# A word that may hide letters behind digits, symbols or the wildcard;
+# `!|+*` only count between other characters ("wow!" keeps its "!").
+_WORD = re.compile(r"(?:[^\W_]|[$@€£])(?:[^\W_]|[$@€£]|[!|+*]+(?=[^\W_]|[$@€£]))*")
+# Three or more single letters or digits split by the same separator: "f u c k", "s.h.1.t"
+_SPELLED_OUT_PATTERN = r"\b[^\W_](?P<sep>[\s.,:;\-_*/\\~·•]{1,3})[^\W_](?P=sep)[^\W_](?:(?P=sep)[^\W_])*(?![^\W_])"
+_SPELLED_OUT = re.compile(_SPELLED_OUT_PATTERN)
+# Finds something in every lowercase text that `normalize` would change
+CHANGEABLE = re.compile(rf"[^\x00-\x7f]|[0-9$@!|+*]|{_SPELLED_OUT_PATTERN}")
+_SEPARATOR = re.compile(r"[^\w]|_")
+
+_folded = {}
+
+
+def _fold(char):
+    folded = _folded.get(char)
+    if folded is None:
+        decomposed = unicodedata.normalize("NFKD", char.lower())
+        folded = "".join(
+            LOOKALIKES.get(part, part)
+            for part in decomposed
+            if not unicodedata.combining(part) and unicodedata.category(part) != "Cf"
+        ).lower()
+        _folded[char] = folded
+    return folded
+
+
+def normalize(text):
+    """Return `text` with obfuscations undone as a `Normalized`, or None if nothing changes.
+
+    `positions[i]` is the index in `text` of the character that produced
+    character `i` of the normalized text.
+    """
+    positions = None
+    if text.isascii():
+        folded = text.lower()
+    else:
+        parts = []
+        positions = []
+        for idx, char in enumerate(text):
+            part = _fold(char)
+            parts.append(part)
+            positions.extend([idx] * len(part))
+        folded = "".join(parts)
+
+    if _SPELLED_OUT.search(folded):
+        if positions is None:
+            positions = list(range(len(folded)))
+        kept = []
+        last = 0
+        for found in _SPELLED_OUT.finditer(folded):
+            kept.extend(range(last, found.start()))
+            kept.extend(
+                idx for idx in range(found.start(), found.end()) if not _SEPARATOR.match(folded[idx])
+            )
+            last = found.end()
+        kept.extend(range(last, len(folded)))
+        folded = "".join(folded[idx] for idx in kept)
+        positions = [positions[idx] for idx in kept]
+
+    masked = False
+    if _DISGUISED.search(folded):
+        # Replacements are one character each, so positions stay aligned
+        pieces = []
+        last = 0
+        for chunk in _DISGUISED_CHUNK.finditer(folded):
+            for found in _WORD.finditer(folded, chunk.start(), chunk.end()):
+                word = found.group()
+                # Numbers such as "2024" or "9/11" stay as they are
+                if word.isalpha() or not any(char.isalpha() for char in word):
+                    continue
+                masked = masked or WILDCARD in word
+                pieces.append(folded[last:found.start()])
+                pieces.append(word.translate(_LEET_TABLE))
+                last = found.end()
+        if pieces:
+            pieces.append(folded[last:])
+            folded = "".join(pieces)
+
+    # A masked word needs the wildcard pass even when nothing else changed
+    if folded == text and not masked:
+        return None
+    if positions is None:
+        positions = range(len(folded))
+    return Normalized(folded, positions)
@@ -0,0 +1,209 @@
+"""Headless batch scanner.
+
+Example:
+    python -m title_scanner scan --channels channels.txt --out results.parquet
+    python -m title_scanner rescore --store title_store.sqlite3
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+import pandas as pd
+from dotenv import load_dotenv
+
+import metrics
+from lexicon import KEYWORDS_PATH, SEVERITY_PATH, load_lexicon
+from report_export import REPORT_FORMATS, open_report_writer
+from quota_scheduler import QuotaScheduler
+from result_cache import ResultCache
+from scan_titles_weighted_contextual_v3_riskaware import scan_titles_weighted, score_titles
+from title_store import TitleStore, add_details, rescore_store, score_channel, sync_channel
+from youtube_client import API_BASE_URL, MAX_IDS_PER_CALL, QuotaExceededError, YouTubeClient
+
+logger = logging.getLogger("title_scanner")
+
+
+def read_channel_ids(path):
+    """Read one channel ID per line, skipping blanks and `#` comments."""
+    with open(path, encoding="utf-8") as handle:
+        ids = (line.split("#", 1)[0].strip() for line in handle)
+        return list(dict.fromkeys(channel_id for channel_id in ids if channel_id))
+
+
+def _scan_channel(client, lexicon, channel_id, uploads_playlist_id, max_results, store, cache, details=False):
+    if store is not None:
+        try:
+            if sync_channel(client, store, channel_id, max_results, uploads_playlist_id) is None:
+                return None
+        except QuotaExceededError:
+            logger.warning("%s: no quota left to sync, using stored titles", channel_id)
+        return pd.DataFrame(score_channel(store, channel_id, lexicon, max_results, cache, details, client))
+    if not details:
+        titles = client.fetch_video_titles(uploads_playlist_id, max_results)
+        return scan_titles_weighted(titles, lexicon=lexicon, cache=cache)
+    videos = client.fetch_videos(uploads_playlist_id, max_results)
+    rows = score_titles([title for _, title in videos], lexicon, cache)
+    return pd.DataFrame(add_details(client, None, channel_id, zip((video_id for video_id, _ in videos), rows), lexicon))
+
+
+def _scan_channel_with_quota(quota, client, *args):
+    with quota:
+        return _scan_channel(client.with_quota(quota), *args)
+
+
+def iter_channel_results(client, lexicon, channel_ids, max_results, store=None, workers=4, cache=None,
+                         details=False, scheduler=None):
+    """Yield (channel_id, results DataFrame or None) as each channel finishes.
+
+    At most `workers` channels are in flight at a time, so memory use does
+    not grow with the number of channels. With a `QuotaScheduler`, each
+    channel draws on its own share of the daily units when it starts, and
+    channels not yet started once the units run out are left out.
+    """
+    channel_ids = list(channel_ids)
+    lookup_client = client
+    if scheduler is not None:
+        # Set aside the playlist lookups before any channel takes its share
+        lookup_quota = scheduler.reserve(-(-len(channel_ids) // MAX_IDS_PER_CALL))
+        lookup_client = client.with_quota(lookup_quota)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        for start in range(0, len(channel_ids), MAX_IDS_PER_CALL):
+            batch = channel_ids[start:start + MAX_IDS_PER_CALL]
+            try:
+                playlists = lookup_client.get_uploads_playlist_ids(batch)
+            except QuotaExceededError:
+                logger.warning("Quota used up; skipping the last %d channels", len(channel_ids) - start)
+                break
+            for offset, channel_id in enumerate(batch):
+                uploads_playlist_id = playlists.get(channel_id)
+                if uploads_playlist_id is None:
+                    yield channel_id, None
+                    continue
+                if len(running) >= workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield running.pop(future), future.result()
+                args = (lexicon, channel_id, uploads_playlist_id, max_results, store, cache, details)
+                if scheduler is None:
+                    future = executor.submit(_scan_channel, client, *args)
+                else:
+                    quota = scheduler.allocate(len(channel_ids) - start - offset)
+                    future = executor.submit(_scan_channel_with_quota, quota, client, *args)
+                running[future] = channel_id
+        if scheduler is not None:
+            lookup_quota.close()
+        for future in as_completed(running):
+            yield running[future], future.result()
+
+
+def run_scan(args):
+    load_dotenv()
+    api_key = args.api_key or os.getenv("YOUTUBE_API_KEY", "")
+    if not api_key:
+        logger.error("No API key: pass --api-key or set YOUTUBE_API_KEY")
+        return 2
+
+    channel_ids = read_channel_ids(args.channels)
+    lexicon = load_lexicon(args.keywords, args.severity)
+    client = YouTubeClient(api_key, base_url=args.base_url, max_workers=args.workers)
+    store = TitleStore(args.store) if args.store else None
+    scheduler = QuotaScheduler(args.daily_quota, store) if args.daily_quota is not None else None
+    if store is not None:
+        # Only results touched by a lexicon edit are scored again
+        rescore_store(store, lexicon)
+    # Templated and re-uploaded titles repeat across channels
+    cache = ResultCache(args.cache_size, args.result_cache)
+
+    failed = 0
+    with open_report_writer(args.out, args.format) as writer:
+        results = iter_channel_results(
+            client, lexicon, channel_ids, args.max_results, store, args.workers, cache, args.details, scheduler
+        )
+        for done, (channel_id, df_results) in enumerate(results, 1):
+            if df_results is None:
+                failed += 1
+                logger.warning("[%d/%d] %s: uploads playlist not found", done, len(channel_ids), channel_id)
+                continue
+            if len(df_results):
+                df_results.insert(0, "Channel ID", channel_id)
+                writer.write(df_results)
+            logger.info("[%d/%d] %s: %d titles", done, len(channel_ids), channel_id, len(df_results))
+        logger.info("Wrote %d rows to %s", writer.rows_written, args.out)
+    logger.info("Result cache: %d hits, %d misses", cache.hits, cache.misses)
+    if scheduler is not None:
+        logger.info("API quota: %d of %d units used today", scheduler.used, scheduler.daily_units)
+
+    cache.close()
+    if store is not None:
+        store.close()
+    return 1 if failed and failed == len(channel_ids) else 0
+
+
+def run_rescore(args):
+    lexicon = load_lexicon(args.keywords, args.severity)
+    store = TitleStore(args.store)
+    result = rescore_store(store, lexicon)
+    store.close()
+    logger.info(
+        "Re-scored %d titles, adjusted %d scores and kept %d results",
+        result.rescored, result.adjusted, result.retagged,
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="title_scanner", description="Scan YouTube channel titles without Streamlit.")
+    parser.add_argument("--metrics", help="Write stage timings and counters here (.json, or .prom for Prometheus).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Scan every channel listed in a file and stream the results.")
+    scan.add_argument("--channels", required=True, help="File with one channel ID per line.")
+    scan.add_argument("--out", required=True, help="Output file (.csv, .jsonl, .parquet or .xlsx).")
+    scan.add_argument("--format", choices=REPORT_FORMATS, help="Output format; inferred from --out by default.")
+    scan.add_argument("--max-results", type=int, default=500, help="Maximum titles per channel (default: 500).")
+    scan.add_argument("--workers", type=int, default=4, help="Channels fetched concurrently (default: 4).")
+    scan.add_argument("--store", help="SQLite title store for incremental syncs between runs.")
+    scan.add_argument("--result-cache", help="SQLite file that keeps scored titles between runs.")
+    scan.add_argument("--cache-size", type=int, default=50_000, help="Scored titles kept in memory (default: 50000).")
+    scan.add_argument("--details", action="store_true", help="Also fetch and score descriptions and tags.")
+    scan.add_argument(
+        "--daily-quota", type=int, help="API units to spend per day, shared fairly between channels (default: no limit)."
+    )
+    scan.add_argument("--api-key", help="YouTube Data API key; defaults to $YOUTUBE_API_KEY.")
+    scan.add_argument("--keywords", default=KEYWORDS_PATH, help="Keyword lexicon CSV.")
+    scan.add_argument("--severity", default=SEVERITY_PATH, help="Severity scores CSV.")
+    scan.add_argument("--base-url", default=API_BASE_URL, help=argparse.SUPPRESS)
+    scan.set_defaults(func=run_scan)
+
+    rescore = commands.add_parser("rescore", help="Update stored results after a lexicon change.")
+    rescore.add_argument("--store", required=True, help="SQLite title store to update.")
+    rescore.add_argument("--keywords", default=KEYWORDS_PATH, help="Keyword lexicon CSV.")
+    rescore.add_argument("--severity", default=SEVERITY_PATH, help="Severity scores CSV.")
+    rescore.set_defaults(func=run_rescore)
+    return parser
+
+
+def write_metrics(path):
+    """Save the collected metrics as Prometheus text (.prom, .txt) or JSON."""
+    text = metrics.to_prometheus() if path.endswith((".prom", ".txt")) else metrics.to_json()
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(text)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    try:
+        return args.func(args)
+    finally:
+        if args.metrics:
+            write_metrics(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,747 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+import requests
+
+from keyword_matcher import keyword_tokens, text_tokens, word_tokens
+from lexicon import Lexicon, LexiconEntry, diff_lexicons
+from scan_core import DETAIL_COLUMNS, MATCHING_VERSION, json_default, score_details, score_titles, scoring_version
+from youtube_client import YouTubeAPIError, playlist_video_id
+
+logger = logging.getLogger(__name__)
+
+TITLE_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "title_store.sqlite3")
+
+SyncResult = namedtuple("SyncResult", ["new", "renamed", "pages", "saved"])
+RescoreResult = namedtuple("RescoreResult", ["rescored", "adjusted", "retagged"])
+
+# Rows re-scored per transaction when a whole version has to be redone
+RESCORE_BATCH = 1000
+# Video IDs per `IN (...)` lookup, well under SQLite's parameter limit
+ID_BATCH = 500
+
+
+class ChannelNotFoundError(LookupError):
+    """Raised when a channel's uploads playlist cannot be resolved."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS videos (
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    scored_title TEXT,
+    scoring_version TEXT,
+    result TEXT,
+    safety_score REAL,
+    PRIMARY KEY (channel_id, video_id)
+);
+CREATE INDEX IF NOT EXISTS videos_by_seq ON videos (channel_id, seq);
+CREATE INDEX IF NOT EXISTS videos_by_version ON videos (scoring_version);
+CREATE TABLE IF NOT EXISTS title_tokens (
+    token TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (token, channel_id, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS title_tokens_by_video ON title_tokens (channel_id, video_id);
+CREATE TABLE IF NOT EXISTS lexicons (
+    scoring_version TEXT PRIMARY KEY,
+    rules_version TEXT NOT NULL,
+    entries TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS result_keywords (
+    keyword TEXT NOT NULL,
+    safety_score REAL,
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (keyword, safety_score, channel_id, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS result_keywords_by_video ON result_keywords (channel_id, video_id);
+CREATE TABLE IF NOT EXISTS result_categories (
+    category TEXT NOT NULL,
+    safety_score REAL,
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (category, safety_score, channel_id, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS result_categories_by_video ON result_categories (channel_id, video_id);
+CREATE TABLE IF NOT EXISTS video_details (
+    channel_id TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    scoring_version TEXT,
+    result TEXT,
+    PRIMARY KEY (channel_id, video_id)
+);
+CREATE TABLE IF NOT EXISTS api_quota (
+    day TEXT PRIMARY KEY,
+    units INTEGER NOT NULL
+);
+"""
+
+# Created after `_migrate`, since older stores lack `safety_score`
+_SCORE_INDEXES = """
+CREATE INDEX IF NOT EXISTS videos_by_score ON videos (safety_score) WHERE result IS NOT NULL;
+CREATE INDEX IF NOT EXISTS videos_by_channel_score ON videos (channel_id, safety_score) WHERE result IS NOT NULL;
+"""
+
+# Upper bound on rows returned by `search`
+MAX_SEARCH_ROWS = 10_000
+
+
+def _split_values(joined, empty):
+    # Result rows join keywords and categories with ", "
+    if not joined or joined == empty:
+        return []
+    return list(dict.fromkeys(joined.split(", ")))
+
+
+class TitleStore:
+    """On-disk store of channel uploads and their latest scan results.
+
+    Videos are keyed by channel and video ID. `seq` orders a channel's
+    uploads with the newest video highest, matching the uploads playlist.
+    Scored titles are also listed in `title_tokens`, an inverted index from
+    each word token to the videos whose scored title contains it, and every
+    lexicon that produced results is kept in `lexicons` so a later lexicon
+    can be diffed against it. `result_keywords` and `result_categories` index
+    stored results by flagged keyword and category, ordered by Safety Score,
+    for `search`. Descriptions and tags fetched for `add_details` are kept in
+    `video_details` with their field scores, and `api_quota` records the API
+    units a `QuotaScheduler` spent per day.
+    """
+
+    def __init__(self, path=TITLE_STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._saved_lexicons = set()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            reindex = self._migrate()
+            self._conn.executescript(_SCORE_INDEXES)
+        if reindex:
+            self.reindex_results()
+
+    def _migrate(self):
+        # Called with the lock held; returns True when results need indexing
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        if "safety_score" in columns:
+            return False
+        self._conn.execute("ALTER TABLE videos ADD COLUMN safety_score REAL")
+        return True
+
+    def close(self):
+        self._conn.close()
+
+    def known_titles(self, channel_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, title FROM videos WHERE channel_id = ?", (channel_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def is_complete(self, channel_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT complete FROM channels WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def save_sync(self, channel_id, fetched, complete):
+        """Record fetched (video_id, title) pairs, newest first.
+
+        Unknown videos listed before the first known one are newer than
+        anything stored; the rest extend the channel's history backwards.
+        Known videos only have their title updated.
+        """
+        known = self.known_titles(channel_id)
+        first_known = next((idx for idx, (video_id, _) in enumerate(fetched) if video_id in known), len(fetched))
+        head = fetched[:first_known]
+        tail = [item for item in fetched[first_known:] if item[0] not in known]
+        renamed = [(title, channel_id, video_id) for video_id, title in fetched if known.get(video_id, title) != title]
+
+        with self._lock, self._conn:
+            low, high = self._conn.execute(
+                "SELECT COALESCE(MIN(seq), 0), COALESCE(MAX(seq), 0) FROM videos WHERE channel_id = ?",
+                (channel_id,),
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO videos (channel_id, video_id, title, seq) VALUES (?, ?, ?, ?)",
+                [(channel_id, video_id, title, high + len(head) - idx) for idx, (video_id, title) in enumerate(head)]
+                + [(channel_id, video_id, title, low - 1 - idx) for idx, (video_id, title) in enumerate(tail)],
+            )
+            self._conn.executemany("UPDATE videos SET title = ? WHERE channel_id = ? AND video_id = ?", renamed)
+            self._conn.execute(
+                "INSERT INTO channels (channel_id, complete) VALUES (?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET complete = MAX(complete, excluded.complete)",
+                (channel_id, int(complete)),
+            )
+        return len(head) + len(tail), len(renamed)
+
+    def pending(self, channel_id, version, limit=None):
+        """Return (video_id, title) pairs that are new, renamed or scored by another version."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT video_id, title FROM ("
+                "  SELECT * FROM videos WHERE channel_id = ? ORDER BY seq DESC LIMIT ?"
+                ") WHERE result IS NULL OR scored_title IS NOT title OR scoring_version IS NOT ?",
+                (channel_id, -1 if limit is None else limit, version),
+            ).fetchall()
+
+    def save_results(self, channel_id, version, scored):
+        """Persist (video_id, result row) pairs produced with `version`."""
+        self.save_result_items(version, [(channel_id, video_id, row) for video_id, row in scored])
+
+    def save_result_items(self, version, items):
+        """Persist (channel_id, video_id, result row) triples and index their titles."""
+        items = list(items)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE videos SET scored_title = ?, scoring_version = ?, result = ?, safety_score = ? "
+                "WHERE channel_id = ? AND video_id = ?",
+                [
+                    (row["Title"], version, json.dumps(row, default=json_default), row["Safety Score"],
+                     channel_id, video_id)
+                    for channel_id, video_id, row in items
+                ],
+            )
+            self._index_titles((channel_id, video_id, row["Title"]) for channel_id, video_id, row in items)
+            self._index_results(items)
+
+    def _index_results(self, items):
+        # Called with the lock held, inside a transaction
+        keys = [(channel_id, video_id) for channel_id, video_id, _ in items]
+        self._conn.executemany("DELETE FROM result_keywords WHERE channel_id = ? AND video_id = ?", keys)
+        self._conn.executemany("DELETE FROM result_categories WHERE channel_id = ? AND video_id = ?", keys)
+        keywords = []
+        categories = []
+        for channel_id, video_id, row in items:
+            score = row["Safety Score"]
+            keywords.extend(
+                (keyword, score, channel_id, video_id) for keyword in _split_values(row["Flagged Words"], "None")
+            )
+            categories.extend(
+                (category, score, channel_id, video_id) for category in _split_values(row["Category"], "-")
+            )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO result_keywords (keyword, safety_score, channel_id, video_id) "
+            "VALUES (?, ?, ?, ?)",
+            keywords,
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO result_categories (category, safety_score, channel_id, video_id) "
+            "VALUES (?, ?, ?, ?)",
+            categories,
+        )
+
+    def reindex_results(self):
+        """Rebuild the score, keyword and category indexes from stored results."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT channel_id, video_id, result FROM videos WHERE result IS NOT NULL"
+            ).fetchall()
+            items = [(channel_id, video_id, json.loads(result)) for channel_id, video_id, result in rows]
+            self._conn.executemany(
+                "UPDATE videos SET safety_score = ? WHERE channel_id = ? AND video_id = ?",
+                [(row["Safety Score"], channel_id, video_id) for channel_id, video_id, row in items],
+            )
+            self._index_results(items)
+        return len(items)
+
+    def search(self, keyword=None, category=None, channel_id=None, min_score=None, max_score=None,
+               limit=100):
+        """Return stored result rows matching every given filter, lowest Safety Score first.
+
+        Each row is a result dict with `Channel ID` and `Video ID` added.
+        `keyword` and `category` must match a flagged keyword or category
+        exactly. The query is driven by the most selective index available,
+        so the cost depends on `limit` rather than on the size of the store.
+        """
+        limit = max(0, min(limit, MAX_SEARCH_ROWS))
+        params = []
+        if keyword is not None:
+            source = "result_keywords AS i JOIN videos AS v USING (channel_id, video_id)"
+            result_column = "v.result"
+            conditions = ["i.keyword = ?"]
+            params.append(keyword.lower())
+        elif category is not None:
+            source = "result_categories AS i JOIN videos AS v USING (channel_id, video_id)"
+            result_column = "v.result"
+            conditions = ["i.category = ?"]
+            params.append(category)
+        else:
+            source = "videos AS i"
+            result_column = "i.result"
+            conditions = ["i.result IS NOT NULL"]
+        if keyword is not None and category is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM result_categories AS c WHERE c.category = ? "
+                "AND c.safety_score = i.safety_score AND c.channel_id = i.channel_id AND c.video_id = i.video_id)"
+            )
+            params.append(category)
+        if channel_id is not None:
+            conditions.append("i.channel_id = ?")
+            params.append(channel_id)
+        if min_score is not None:
+            conditions.append("i.safety_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append("i.safety_score <= ?")
+            params.append(max_score)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT i.channel_id, i.video_id, {result_column} FROM {source} "
+                f"WHERE {' AND '.join(conditions)} ORDER BY i.safety_score LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        return [
+            {"Channel ID": row_channel_id, "Video ID": video_id, **json.loads(result)}
+            for row_channel_id, video_id, result in rows
+        ]
+
+    def _index_titles(self, titles):
+        # Called with the lock held, inside a transaction
+        titles = list(titles)
+        self._conn.executemany(
+            "DELETE FROM title_tokens WHERE channel_id = ? AND video_id = ?",
+            [(channel_id, video_id) for channel_id, video_id, _ in titles],
+        )
+        self._conn.executemany(
+            "INSERT INTO title_tokens (token, channel_id, video_id) VALUES (?, ?, ?)",
+            [
+                (token, channel_id, video_id)
+                for channel_id, video_id, title in titles
+                for token in text_tokens(title.lower())
+            ],
+        )
+
+    def index_tokens(self):
+        """Add scored titles that predate the token index to it."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT channel_id, video_id, scored_title FROM videos AS v WHERE result IS NOT NULL "
+                "AND NOT EXISTS (SELECT 1 FROM title_tokens AS t "
+                "WHERE t.channel_id = v.channel_id AND t.video_id = v.video_id)"
+            ).fetchall()
+            self._index_titles(rows)
+        return len(rows)
+
+    def save_lexicon(self, lexicon):
+        """Keep a snapshot of the lexicon behind `scoring_version(lexicon)`."""
+        version = scoring_version(lexicon)
+        if version in self._saved_lexicons:
+            return
+        entries = json.dumps([list(entry) for entry in lexicon.entries], default=json_default)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO lexicons (scoring_version, rules_version, entries) VALUES (?, ?, ?)",
+                (version, MATCHING_VERSION, entries),
+            )
+        self._saved_lexicons.add(version)
+
+    def lexicon_snapshot(self, version):
+        """Return (rules_version, Lexicon) saved for `version`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rules_version, entries FROM lexicons WHERE scoring_version = ?", (version,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], Lexicon(LexiconEntry(*values) for values in json.loads(row[1]))
+
+    def result_versions(self):
+        """Return every scoring version that stored results were produced with."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT scoring_version FROM videos WHERE scoring_version IS NOT NULL"
+            ).fetchall()
+        return [version for version, in rows]
+
+    def results_with_tokens(self, version, tokens):
+        """Return current results of `version` whose title has every token in `tokens`.
+
+        Rows are (channel_id, video_id, title, result row) tuples.
+        """
+        tokens = sorted(tokens)
+        placeholders = ", ".join("?" * len(tokens))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT v.channel_id, v.video_id, v.title, v.result FROM videos AS v JOIN ("
+                f"  SELECT channel_id, video_id FROM title_tokens WHERE token IN ({placeholders}) "
+                "  GROUP BY channel_id, video_id HAVING COUNT(*) = ?"
+                ") USING (channel_id, video_id) "
+                "WHERE v.scoring_version = ? AND v.scored_title IS v.title AND v.result IS NOT NULL",
+                [*tokens, len(tokens), version],
+            ).fetchall()
+        return [(channel_id, video_id, title, json.loads(result)) for channel_id, video_id, title, result in rows]
+
+    def titles_with_version(self, version, limit):
+        """Return up to `limit` (channel_id, video_id, title) with up-to-date results of `version`."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT channel_id, video_id, title FROM videos "
+                "WHERE scoring_version = ? AND scored_title IS title AND result IS NOT NULL LIMIT ?",
+                (version, limit),
+            ).fetchall()
+
+    def retag(self, old_version, new_version):
+        """Mark up-to-date results of `old_version` as produced by `new_version`."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE videos SET scoring_version = ? "
+                "WHERE scoring_version = ? AND scored_title IS title AND result IS NOT NULL",
+                (new_version, old_version),
+            ).rowcount
+
+    def details(self, channel_id, video_ids):
+        """Map stored video IDs to (VideoDetails fields, scoring_version, field scores or None)."""
+        video_ids = list(video_ids)
+        found = {}
+        with self._lock:
+            for start in range(0, len(video_ids), ID_BATCH):
+                batch = video_ids[start:start + ID_BATCH]
+                rows = self._conn.execute(
+                    "SELECT video_id, description, tags, scoring_version, result FROM video_details "
+                    f"WHERE channel_id = ? AND video_id IN ({', '.join('?' * len(batch))})",
+                    [channel_id, *batch],
+                ).fetchall()
+                for video_id, description, tags, version, result in rows:
+                    found[video_id] = (
+                        (description, json.loads(tags)), version, None if result is None else json.loads(result)
+                    )
+        return found
+
+    def save_details(self, channel_id, details, version, scores):
+        """Persist fetched `VideoDetails` by video ID together with their field scores."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO video_details "
+                "(channel_id, video_id, description, tags, scoring_version, result) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (channel_id, video_id, description, json.dumps(tags), version, json.dumps(scores[video_id]))
+                    for video_id, (description, tags) in details.items()
+                ],
+            )
+
+    def save_detail_scores(self, channel_id, version, scores):
+        """Replace the field scores of stored details by video ID."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE video_details SET scoring_version = ?, result = ? WHERE channel_id = ? AND video_id = ?",
+                [(version, json.dumps(row), channel_id, video_id) for video_id, row in scores.items()],
+            )
+
+    def quota_used(self, day):
+        with self._lock:
+            row = self._conn.execute("SELECT units FROM api_quota WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def add_quota_used(self, day, units):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO api_quota (day, units) VALUES (?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET units = units + excluded.units",
+                (day, units),
+            )
+
+    def result_items(self, channel_id, limit=None):
+        """Return stored (video_id, result row) pairs for a channel, newest upload first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, result FROM videos WHERE channel_id = ? AND result IS NOT NULL "
+                "ORDER BY seq DESC LIMIT ?",
+                (channel_id, -1 if limit is None else limit),
+            ).fetchall()
+        return [(video_id, json.loads(result)) for video_id, result in rows]
+
+    def results(self, channel_id, limit=None):
+        """Return the stored result rows for a channel, newest upload first."""
+        return [row for _, row in self.result_items(channel_id, limit)]
+
+
+def iter_sync_pages(client, store, channel_id, max_results=None, uploads_playlist_id=None):
+    """Bring the stored uploads of a channel up to date, one page at a time.
+
+    Yields the (video_id, title) pairs of each playlist page as soon as it
+    is fetched and saves the sync once the walk ends. The uploads playlist
+    is walked newest first and stops on the page where a stored video ID
+    turns up, so a repeat sync usually costs one or two pages. Older pages
+    are only fetched while fewer than `max_results` videos are stored (or,
+    with no limit, until the playlist is exhausted).
+
+    The uploads playlist is looked up unless `uploads_playlist_id` is
+    given, which saves a `channels` call when it was resolved in a batch.
+    Raises `ChannelNotFoundError` when the uploads playlist is not found and
+    returns a `SyncResult` when exhausted. Its `saved` is False when an error
+    cut the walk short before it reached the stored uploads; nothing fetched
+    is kept then, since it would leave a gap.
+    """
+    if uploads_playlist_id is None:
+        uploads_playlist_id = client.get_uploads_playlist_id(channel_id)
+    if not uploads_playlist_id:
+        raise ChannelNotFoundError(channel_id)
+
+    known = store.known_titles(channel_id)
+    complete = store.is_complete(channel_id)
+    fetched = []
+    seen = set()
+    unknown = 0
+    reached_known = False
+    pages = 0
+    exhausted = False
+    try:
+        for items, next_token in client.iter_playlist_pages(uploads_playlist_id, raise_errors=True, next_tokens=True):
+            pages += 1
+            page = []
+            for item in items:
+                video_id = playlist_video_id(item)
+                if not video_id or video_id in seen:
+                    continue
+                seen.add(video_id)
+                page.append((video_id, item["snippet"]["title"]))
+                if video_id in known:
+                    reached_known = True
+                else:
+                    unknown += 1
+            fetched.extend(page)
+            yield page
+            if not next_token:
+                exhausted = True
+                break
+            enough = max_results is not None and len(known) + unknown >= max_results
+            if (reached_known and (complete or enough)) or (not known and enough):
+                break
+    except (requests.exceptions.RequestException, ValueError, YouTubeAPIError) as e:
+        logger.error("Sync of channel %s stopped early: %s", channel_id, e)
+        if not reached_known and known:
+            # Saving now would leave a gap between the new and stored uploads
+            return SyncResult(new=0, renamed=0, pages=pages, saved=False)
+
+    new, renamed = store.save_sync(channel_id, fetched, complete=exhausted)
+    return SyncResult(new=new, renamed=renamed, pages=pages, saved=True)
+
+
+def sync_channel(client, store, channel_id, max_results=None, uploads_playlist_id=None):
+    """Run `iter_sync_pages` to completion.
+
+    Returns its `SyncResult`, or None when the uploads playlist is not found.
+    """
+    pages = iter_sync_pages(client, store, channel_id, max_results, uploads_playlist_id)
+    try:
+        while True:
+            next(pages)
+    except ChannelNotFoundError:
+        return None
+    except StopIteration as stop:
+        return stop.value
+
+
+def score_channel(store, channel_id, lexicon, limit=None, cache=None, details=False, client=None):
+    """Score only the new or renamed stored titles and return all result rows.
+
+    Rows come back newest upload first. Titles scored with a different
+    lexicon or rule set are re-scored as well. With `details`, description
+    and tag scores are added to each row (see `add_details`); details that
+    are not stored yet are only fetched when `client` is given.
+    """
+    items = _score_stored(store, channel_id, lexicon, limit, cache)
+    if details:
+        return add_details(client, store, channel_id, items, lexicon)
+    return [row for _, row in items]
+
+
+def add_details(client, store, channel_id, items, lexicon):
+    """Return the rows of (video_id, result row) pairs with `DETAIL_COLUMNS` added.
+
+    Descriptions and tags missing from `store` are fetched with `client`, 50
+    videos per call, and kept in the store; with no client, or no quota left,
+    the columns of videos without details are None. Each field is scored
+    once per lexicon and rule set and the scores are stored alongside.
+    """
+    items = list(items)
+    version = scoring_version(lexicon)
+    stored = store.details(channel_id, [video_id for video_id, _ in items]) if store is not None else {}
+    missing = [video_id for video_id, _ in items if video_id not in stored]
+    fetched = client.fetch_video_details(missing) if client is not None and missing else {}
+
+    scores = {}
+    stale = {}
+    for video_id, (fields, scored_version, result) in stored.items():
+        if scored_version == version and result is not None:
+            scores[video_id] = result
+        else:
+            stale[video_id] = scores[video_id] = score_details(*fields, lexicon)
+    for video_id, fields in fetched.items():
+        scores[video_id] = score_details(fields.description, fields.tags, lexicon)
+    if store is not None:
+        if fetched:
+            store.save_details(channel_id, fetched, version, scores)
+        if stale:
+            store.save_detail_scores(channel_id, version, stale)
+
+    empty = dict.fromkeys(DETAIL_COLUMNS)
+    return [{**row, **scores.get(video_id, empty)} for video_id, row in items]
+
+
+def _score_pairs(pairs, lexicon, cache):
+    rows = score_titles([title for _, title in pairs], lexicon, cache)
+    return [(video_id, row) for (video_id, _), row in zip(pairs, rows)]
+
+
+def _score_stored(store, channel_id, lexicon, limit, cache=None):
+    version = scoring_version(lexicon)
+    pending = store.pending(channel_id, version, limit)
+    if pending:
+        store.save_lexicon(lexicon)
+        store.save_results(channel_id, version, _score_pairs(pending, lexicon, cache))
+    return store.result_items(channel_id, limit)
+
+
+def iter_channel_scan(client, store, channel_id, lexicon, max_results=None, cache=None, details=False):
+    """Sync a channel and yield lists of result rows as soon as they are ready.
+
+    Each fetched playlist page is scored and yielded before the next page is
+    requested, so the first rows arrive after one API call. Stored rows for
+    older uploads follow once the sync is done. With `details`, every batch
+    also carries description and tag scores (see `add_details`). Raises
+    `ChannelNotFoundError` when the uploads playlist is not found.
+    """
+    scored = []
+    pages = iter_sync_pages(client, store, channel_id, max_results)
+    while True:
+        try:
+            page = next(pages)
+        except StopIteration as stop:
+            sync = stop.value
+            break
+        if max_results is not None:
+            page = page[:max(max_results - len(scored), 0)]
+        rows = _score_pairs(page, lexicon, cache)
+        if rows:
+            scored.extend(rows)
+            if details:
+                yield add_details(client, store, channel_id, rows, lexicon)
+            else:
+                yield [row for _, row in rows]
+
+    # The fetched videos exist in the store only now that the sync is saved,
+    # and not at all when it stopped short of the stored ones
+    if sync.saved:
+        store.save_lexicon(lexicon)
+        store.save_results(channel_id, scoring_version(lexicon), scored)
+    emitted = {video_id for video_id, _ in scored}
+    stored = _score_stored(store, channel_id, lexicon, max_results, cache)
+    rest = [(video_id, row) for video_id, row in stored if video_id not in emitted]
+    if max_results is not None:
+        rest = rest[:max(max_results - len(emitted), 0)]
+    if rest:
+        yield add_details(client, store, channel_id, rest, lexicon) if details else [row for _, row in rest]
+
+
+def _rescore_items(store, version, titles, lexicon, cache):
+    # titles: (channel_id, video_id, title)
+    rows = score_titles([title for _, _, title in titles], lexicon, cache)
+    store.save_result_items(version, [
+        (channel_id, video_id, row) for (channel_id, video_id, _), row in zip(titles, rows)
+    ])
+    return len(rows)
+
+
+def _results_with_keyword(store, version, keyword):
+    # Titles that can contain `keyword` as written, disguised or masked
+    results = {}
+    for tokens in keyword_tokens(keyword):
+        for result in store.results_with_tokens(version, tokens):
+            results.setdefault(result[:2], result)
+    return results.values()
+
+
+def _rescore_version(store, old_version, lexicon, diff, cache):
+    version = scoring_version(lexicon)
+    rescore = {}
+    for keyword in diff.changed:
+        for channel_id, video_id, title, _ in _results_with_keyword(store, old_version, keyword):
+            rescore[channel_id, video_id] = title
+
+    adjusted = {}
+    if diff.severity_deltas:
+        # The whole lexicon decides which keyword a masked word stands for
+        matcher = lexicon.matcher
+        for keyword in diff.severity_deltas:
+            for channel_id, video_id, title, row in _results_with_keyword(store, old_version, keyword):
+                key = (channel_id, video_id)
+                if key in rescore or key in adjusted:
+                    continue
+                found = matcher.find_keywords(title.lower()) & diff.severity_deltas.keys()
+                if not found:
+                    continue
+                score = row["Safety Score"]
+                if 0 < score < 100:
+                    # An unclamped score gives the total deduction back exactly
+                    delta = sum(diff.severity_deltas[hit] for hit in found)
+                    row["Safety Score"] = max(0, min(100, score - delta))
+                    adjusted[key] = row
+                else:
+                    rescore[key] = title
+
+    rescored = _rescore_items(
+        store, version, [(channel_id, video_id, title) for (channel_id, video_id), title in rescore.items()],
+        lexicon, cache,
+    )
+    store.save_result_items(version, [
+        (channel_id, video_id, row) for (channel_id, video_id), row in adjusted.items()
+    ])
+    return rescored, len(adjusted)
+
+
+def rescore_store(store, lexicon, cache=None):
+    """Bring every stored result up to date with `lexicon` without a full rescan.
+
+    For each older scoring version the saved lexicon is diffed against the
+    new one. Titles containing the tokens of an added, removed or edited
+    keyword, as written or normalized, are re-scored; titles hit by a keyword
+    whose only change is its severity get the delta applied to their score;
+    every other result is simply re-tagged with the new version. A whole
+    version is re-scored when its lexicon was not saved, the risk rules or
+    the text normalizer changed, or keywords were reordered. Renamed titles are left for the next `score_channel`.
+    """
+    version = scoring_version(lexicon)
+    store.save_lexicon(lexicon)
+    store.index_tokens()
+    rescored = adjusted = retagged = 0
+    for old_version in store.result_versions():
+        if old_version == version:
+            continue
+        snapshot = store.lexicon_snapshot(old_version)
+        diff = None
+        if snapshot is not None and snapshot[0] == MATCHING_VERSION:
+            diff = diff_lexicons(snapshot[1], lexicon)
+        untokenized = diff is not None and any(
+            not word_tokens(keyword) for keyword in diff.changed | diff.severity_deltas.keys()
+        )
+        if diff is None or diff.reordered or untokenized:
+            logger.info("Re-scoring every result of version %s", old_version)
+            while True:
+                titles = store.titles_with_version(old_version, RESCORE_BATCH)
+                if not titles:
+                    break
+                rescored += _rescore_items(store, version, titles, lexicon, cache)
+            continue
+        version_rescored, version_adjusted = _rescore_version(store, old_version, lexicon, diff, cache)
+        rescored += version_rescored
+        adjusted += version_adjusted
+        retagged += store.retag(old_version, version)
+    logger.info("Rescore to %s: %d re-scored, %d adjusted, %d re-tagged", version, rescored, adjusted, retagged)
+    return RescoreResult(rescored=rescored, adjusted=adjusted, retagged=retagged)
@@ -0,0 +1,217 @@
+import copy
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# The Data API accepts up to 50 IDs per `channels` call and 50 items per page
+MAX_IDS_PER_CALL = 50
+PAGE_SIZE = 50
+# Quota units charged per call; every list endpoint used here costs one
+QUOTA_COSTS = {"channels": 1, "playlistItems": 1, "videos": 1}
+# Error reasons with which the API refuses calls once the project's quota is spent
+QUOTA_ERROR_REASONS = frozenset(["quotaExceeded", "dailyLimitExceeded"])
+
+VideoDetails = namedtuple("VideoDetails", ["description", "tags"])
+
+
+class YouTubeAPIError(Exception):
+    """Raised when the Data API answers with an error payload."""
+
+
+class QuotaExceededError(YouTubeAPIError):
+    """Raised instead of making a call the remaining quota cannot cover, or when the API reports its quota spent."""
+
+
+def playlist_video_id(item):
+    """Return the video ID of a `playlistItems` item."""
+    snippet = item.get("snippet", {})
+    return snippet.get("resourceId", {}).get("videoId") or item.get("contentDetails", {}).get("videoId")
+
+
+def make_session(retries=3, backoff_factor=0.5, pool_size=16):
+    """Create a keep-alive session that retries 429 and 5xx responses with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class YouTubeClient:
+    """Fetches uploads playlists and video titles over one pooled HTTP session.
+
+    `base_url` can point at a local stand-in server that mimics the
+    `channels`, `playlistItems` and `videos` endpoints. When `quota` is set,
+    every call is charged to it first with `quota.spend(units)`, which
+    raises `QuotaExceededError` once the units run out.
+    """
+
+    def __init__(self, api_key, base_url=API_BASE_URL, session=None, timeout=10, max_workers=8, quota=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.session = session or make_session(pool_size=max(max_workers, 1) * 2)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.quota = quota
+
+    def with_quota(self, quota):
+        """Return a client sharing this one's session that charges calls to `quota`."""
+        client = copy.copy(self)
+        client.quota = quota
+        return client
+
+    def _get(self, endpoint, **params):
+        if self.quota is not None:
+            self.quota.spend(QUOTA_COSTS.get(endpoint, 1))
+        params["key"] = self.api_key
+        metrics.increment("api_calls")
+        with metrics.timer(f"api.{endpoint}"):
+            response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=self.timeout)
+            data = response.json()
+        error = data.get("error") if isinstance(data, dict) else None
+        if isinstance(error, dict) and any(
+            detail.get("reason") in QUOTA_ERROR_REASONS for detail in error.get("errors", [])
+        ):
+            raise QuotaExceededError(error.get("message", "YouTube API quota exceeded"))
+        return data
+
+    def get_uploads_playlist_ids(self, channel_ids):
+        """Map each channel ID to its uploads playlist ID, 50 channels per call."""
+        channel_ids = list(dict.fromkeys(channel_ids))
+        playlists = {}
+        for start in range(0, len(channel_ids), MAX_IDS_PER_CALL):
+            batch = channel_ids[start:start + MAX_IDS_PER_CALL]
+            try:
+                data = self._get("channels", part="contentDetails", id=",".join(batch))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("Error fetching channel details: %s", e)
+                continue
+            for item in data.get("items", []):
+                try:
+                    playlists[item["id"]] = item["contentDetails"]["relatedPlaylists"]["uploads"]
+                except KeyError:
+                    continue
+        return playlists
+
+    def get_uploads_playlist_id(self, channel_id):
+        return self.get_uploads_playlist_ids([channel_id]).get(channel_id)
+
+    def iter_playlist_pages(self, uploads_playlist_id, raise_errors=False, next_tokens=False):
+        """Yield the raw `items` of each playlist page, newest uploads first.
+
+        Pages are requested strictly in order because each one needs the
+        previous page's `nextPageToken`. With `next_tokens`, (items, token)
+        pairs are yielded instead, and an empty token marks the last page.
+        Request errors end the iteration quietly unless `raise_errors` is set.
+        """
+        page_token = ""
+        while True:
+            try:
+                data = self._get(
+                    "playlistItems",
+                    playlistId=uploads_playlist_id,
+                    part="snippet",
+                    maxResults=PAGE_SIZE,
+                    pageToken=page_token,
+                )
+            except QuotaExceededError as e:
+                logger.warning("Stopped fetching playlist %s: %s", uploads_playlist_id, e)
+                if raise_errors:
+                    raise
+                return
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("Error fetching playlist items: %s", e)
+                if raise_errors:
+                    raise
+                return
+            if "error" in data:
+                logger.error("YouTube API error for playlist %s: %s", uploads_playlist_id, data["error"])
+                if raise_errors:
+                    raise YouTubeAPIError(data["error"])
+                return
+            page_token = data.get("nextPageToken", "")
+            yield (data.get("items", []), page_token) if next_tokens else data.get("items", [])
+            if not page_token:
+                return
+
+    def fetch_video_titles(self, uploads_playlist_id, max_results):
+        titles = []
+        for items in self.iter_playlist_pages(uploads_playlist_id):
+            titles.extend(item["snippet"]["title"] for item in items)
+            if len(titles) >= max_results:
+                break
+        return titles[:max_results]
+
+    def fetch_videos(self, uploads_playlist_id, max_results=None):
+        """Return up to `max_results` (video_id, title) pairs, newest upload first."""
+        videos = []
+        for items in self.iter_playlist_pages(uploads_playlist_id):
+            videos.extend((playlist_video_id(item), item["snippet"]["title"]) for item in items)
+            if max_results is not None and len(videos) >= max_results:
+                break
+        return videos[:max_results]
+
+    def fetch_video_details(self, video_ids):
+        """Map video IDs to their `VideoDetails`, 50 videos per `videos` call.
+
+        Videos that are missing, private or in a batch that failed are left
+        out. Running out of quota stops the fetch and returns what arrived.
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        details = {}
+        for start in range(0, len(video_ids), MAX_IDS_PER_CALL):
+            batch = video_ids[start:start + MAX_IDS_PER_CALL]
+            try:
+                data = self._get(
+                    "videos", part="snippet", id=",".join(batch), fields="items(id,snippet(description,tags))"
+                )
+            except QuotaExceededError as e:
+                logger.warning("Stopped fetching video details: %s", e)
+                break
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error("Error fetching video details: %s", e)
+                continue
+            if "error" in data:
+                logger.error("YouTube API error for video details: %s", data["error"])
+                continue
+            for item in data.get("items", []):
+                snippet = item.get("snippet", {})
+                details[item["id"]] = VideoDetails(snippet.get("description", ""), snippet.get("tags", []))
+        return details
+
+    def fetch_channels(self, channel_ids, max_results):
+        """Fetch titles for many channels at once.
+
+        Playlist IDs are resolved in batches, then each channel's pages are
+        walked on its own worker thread. Returns a dict of channel ID to
+        titles, with None for channels whose uploads playlist was not found.
+        """
+        channel_ids = list(dict.fromkeys(channel_ids))
+        playlists = self.get_uploads_playlist_ids(channel_ids)
+        results = {channel_id: None for channel_id in channel_ids}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                channel_id: executor.submit(self.fetch_video_titles, playlists[channel_id], max_results)
+                for channel_id in channel_ids
+                if channel_id in playlists
+            }
+            for channel_id, future in futures.items():
+                results[channel_id] = future.result()
+        return results